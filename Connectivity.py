@@ -0,0 +1,323 @@
+import numpy as np
+from SimpleQubit import DEFAULT_GRID
+
+# Gaps narrower than this are closed when the layout is written on the database grid.
+DEFAULT_TOLERANCE = DEFAULT_GRID / 2
+
+# Number of edge pairs tested at once, which bounds the memory of the exact tests.
+CHUNK_SIZE = 1 << 18
+
+
+def merge_layers(polygon_arrays: dict) -> tuple:
+    """
+    Concatenate the ragged polygon arrays of several layers into one.
+
+    Args:
+        polygon_arrays (dict): for each layer, a tuple (vertices, offsets) as
+            returned by SimpleQubit.get_polygon_arrays.
+    Returns:
+        tuple: vertices (V, 2), offsets (P + 1,) and layers (P,) of all polygons
+    """
+    vertices, offsets, layers = [], [np.zeros(1, dtype=np.int64)], []
+    start = 0
+    for layer, (layer_vertices, layer_offsets) in polygon_arrays.items():
+        vertices.append(layer_vertices)
+        offsets.append(layer_offsets[1:] + start)
+        layers.append(np.full(len(layer_offsets) - 1, layer, dtype=np.int64))
+        start += len(layer_vertices)
+    if not vertices:
+        return np.empty((0, 2)), offsets[0], np.empty(0, dtype=np.int64)
+    return np.concatenate(vertices), np.concatenate(offsets), np.concatenate(layers)
+
+
+def bounding_boxes(vertices: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Compute the bounding box of every polygon of a ragged polygon array.
+
+    Args:
+        vertices (np.ndarray): Vertices of all polygons, of shape (V, 2).
+        offsets (np.ndarray): Start of each polygon in vertices, then V, of shape (P + 1,).
+    Returns:
+        np.ndarray: array of shape (P, 2, 2) with ((x_min, y_min), (x_max, y_max)) per polygon
+    """
+    if len(offsets) < 2:
+        return np.empty((0, 2, 2))
+    starts = offsets[:-1]
+    return np.stack(
+        [np.minimum.reduceat(vertices, starts, axis=0), np.maximum.reduceat(vertices, starts, axis=0)],
+        axis=1,
+    )
+
+
+def rectangles(vertices: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Find the polygons which are axis-aligned rectangles, and so are equal to
+    their bounding box.
+
+    Args:
+        vertices (np.ndarray): Vertices of all polygons, of shape (V, 2).
+        offsets (np.ndarray): Start of each polygon in vertices, then V, of shape (P + 1,).
+    Returns:
+        np.ndarray: boolean array, True for the rectangles
+    """
+    result = np.diff(offsets) == 4
+    corners = vertices[offsets[:-1][result, None] + np.arange(4)]
+    following = np.roll(corners, -1, axis=1)
+    # Each edge is either horizontal or vertical, alternately.
+    horizontal = corners[..., 1] == following[..., 1]
+    vertical = corners[..., 0] == following[..., 0]
+    result[result] = ((horizontal != vertical) & (horizontal != np.roll(horizontal, 1, axis=1))).all(axis=1)
+    return result
+
+
+def overlapping_pairs(boxes: np.ndarray, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    Find the pairs of boxes which overlap or are closer than the tolerance.
+    Boxes are binned on a uniform grid with cells of the median box size, and
+    only boxes sharing a cell are compared. Each pair is found in the cell
+    which contains the lower left corner of the intersection of the boxes,
+    so it is found once. Pairs are yielded in chunks, to bound the memory
+    of dense layouts.
+
+    Args:
+        boxes (np.ndarray): Boxes of shape (P, 2, 2), as returned by bounding_boxes.
+        tolerance (float): Largest gap between boxes which are paired.
+    Returns:
+        Iterator of (i, j) index arrays with i < j
+    """
+    if len(boxes) < 2:
+        return
+    # Boxes grown by the tolerance overlap when the original boxes are close enough.
+    low = boxes[:, 0] - tolerance / 2
+    high = boxes[:, 1] + tolerance / 2
+    size = float(np.median((high - low).max(axis=1)))
+    if size <= 0:
+        size = 1.0
+    origin = low.min(axis=0)
+    first_cell = np.floor((low - origin) / size).astype(np.int64)
+    last_cell = np.floor((high - origin) / size).astype(np.int64)
+    columns = int(last_cell[:, 0].max()) + 1
+
+    # One entry per box and cell it covers, sorted by cell.
+    spans = last_cell - first_cell + 1
+    counts = spans[:, 0] * spans[:, 1]
+    box = np.repeat(np.arange(len(boxes)), counts)
+    rank = np.arange(len(box)) - np.repeat(np.cumsum(counts) - counts, counts)
+    x = first_cell[box, 0] + rank % spans[box, 0]
+    y = first_cell[box, 1] + rank // spans[box, 0]
+    cell = y * columns + x
+    order = np.argsort(cell, kind="stable")
+    box, cell = box[order], cell[order]
+
+    # Each entry is paired with the entries after it in the same cell.
+    cell_end = np.searchsorted(cell, cell, side="right")
+    partners = cell_end - np.arange(len(cell)) - 1
+    cumulative = np.cumsum(partners)
+    start = 0
+    while start < len(cell):
+        # As many entries as fit in one chunk of candidates, but at least one.
+        before = cumulative[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(cumulative, before + CHUNK_SIZE, side="right")))
+        chunk_partners = partners[start:stop]
+        first = np.repeat(np.arange(start, stop), chunk_partners)
+        second = first + 1 + np.arange(len(first)) - np.repeat(
+            np.cumsum(chunk_partners) - chunk_partners, chunk_partners
+        )
+        i, j = box[first], box[second]
+        corner = np.maximum(low[i], low[j])
+        corner_cell = np.floor((corner - origin) / size).astype(np.int64)
+        keep = (
+            (corner_cell[:, 1] * columns + corner_cell[:, 0] == cell[first])
+            & (corner <= np.minimum(high[i], high[j])).all(axis=1)
+        )
+        i, j = i[keep], j[keep]
+        if len(i):
+            yield np.minimum(i, j), np.maximum(i, j)
+        start = stop
+
+
+def touching_pairs(
+    vertices: np.ndarray,
+    offsets: np.ndarray,
+    i: np.ndarray,
+    j: np.ndarray,
+    tolerance: float = DEFAULT_TOLERANCE,
+    rectangle: np.ndarray = None,
+    boxes: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Test exactly which pairs of polygons overlap or touch: two polygons touch
+    when an edge of one is closer than the tolerance to an edge of the
+    other, and overlap without touching when one contains the other. Pairs
+    of rectangles are tested from their bounding boxes only, and other pairs
+    of polygons with the same numbers of vertices are tested together.
+
+    Args:
+        vertices (np.ndarray): Vertices of all polygons, of shape (V, 2).
+        offsets (np.ndarray): Start of each polygon in vertices, then V, of shape (P + 1,).
+        i (np.ndarray): First polygon of each pair.
+        j (np.ndarray): Second polygon of each pair.
+        tolerance (float): Largest gap between polygons which touch.
+        rectangle (np.ndarray): Result of rectangles() for the polygons, computed if None.
+        boxes (np.ndarray): Result of bounding_boxes() for the polygons, computed if None.
+    Returns:
+        np.ndarray: boolean array, True for the pairs which touch or overlap
+    """
+    if rectangle is None:
+        rectangle = rectangles(vertices, offsets)
+    if boxes is None:
+        boxes = bounding_boxes(vertices, offsets)
+    result = np.zeros(len(i), dtype=bool)
+    both = rectangle[i] & rectangle[j]
+    a, b = boxes[i[both]], boxes[j[both]]
+    gap = np.maximum(np.maximum(b[:, 0] - a[:, 1], a[:, 0] - b[:, 1]), 0)
+    result[both] = (gap * gap).sum(axis=1) <= tolerance**2
+    tested = np.flatnonzero(~both)
+    i, j = i[tested], j[tested]
+    sizes = np.diff(offsets)
+    largest = int(sizes.max(initial=0)) + 1
+    keys = sizes[i] * largest + sizes[j]
+    order = np.argsort(keys, kind="stable")
+    groups, starts = np.unique(keys[order], return_index=True)
+    for key, first, last in zip(groups.tolist(), starts, [*starts[1:], len(order)]):
+        size_i, size_j = divmod(key, largest)
+        indices = order[first:last]
+        step = max(1, CHUNK_SIZE // (size_i * size_j))
+        for start in range(0, len(indices), step):
+            selected = indices[start : start + step]
+            a = vertices[offsets[i[selected], None] + np.arange(size_i)]
+            b = vertices[offsets[j[selected], None] + np.arange(size_j)]
+            result[tested[selected]] = _polygons_touch(a, b, tolerance)
+    return result
+
+
+def connected_components(
+    vertices: np.ndarray, offsets: np.ndarray, tolerance: float = DEFAULT_TOLERANCE
+) -> np.ndarray:
+    """
+    Label the connected regions made of polygons which overlap or touch,
+    without computing their union.
+
+    Args:
+        vertices (np.ndarray): Vertices of all polygons, of shape (V, 2).
+        offsets (np.ndarray): Start of each polygon in vertices, then V, of shape (P + 1,).
+        tolerance (float): Largest gap between polygons which are connected.
+    Returns:
+        np.ndarray: label of the region of each polygon, from 0 to the number of regions - 1
+    """
+    first, second = [], []
+    rectangle = rectangles(vertices, offsets)
+    boxes = bounding_boxes(vertices, offsets)
+    for i, j in overlapping_pairs(boxes, tolerance):
+        touching = touching_pairs(vertices, offsets, i, j, tolerance, rectangle, boxes)
+        first.append(i[touching])
+        second.append(j[touching])
+    parent = np.arange(len(offsets) - 1)
+    if first:
+        parent = _union(parent, np.concatenate(first), np.concatenate(second))
+    return np.unique(parent, return_inverse=True)[1].reshape(-1)
+
+
+def is_connected(polygon_arrays: dict, tolerance: float = DEFAULT_TOLERANCE) -> bool:
+    """
+    Decide whether polygons, on any layer, form a single connected region.
+
+    Args:
+        polygon_arrays (dict): for each layer, a tuple (vertices, offsets) as
+            returned by SimpleQubit.get_polygon_arrays.
+        tolerance (float): Largest gap between polygons which are connected.
+    Returns:
+        bool: True if there is at most one region
+    """
+    vertices, offsets, _ = merge_layers(polygon_arrays)
+    labels = connected_components(vertices, offsets, tolerance)
+    return len(labels) == 0 or labels.max() == 0
+
+
+def squared_segment_distance(p: np.ndarray, s1: np.ndarray, s2: np.ndarray) -> np.ndarray:
+    """
+    Compute the squared distance from points to segments.
+
+    Args:
+        p (np.ndarray): Points of shape (E, 2).
+        s1 (np.ndarray): First end of the segments, of shape (E, 2).
+        s2 (np.ndarray): Second end of the segments, of shape (E, 2).
+    Returns:
+        np.ndarray: squared distance from each point to its segment, of shape (E,)
+    """
+    dx, dy = s2[:, 0] - s1[:, 0], s2[:, 1] - s1[:, 1]
+    px, py = p[:, 0] - s1[:, 0], p[:, 1] - s1[:, 1]
+    length = dx * dx + dy * dy
+    t = np.clip((px * dx + py * dy) / np.where(length > 0, length, 1), 0, 1)
+    px -= t * dx
+    py -= t * dy
+    return px * px + py * py
+
+
+def contains(polygons: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Test whether points are inside polygons, with the even-odd rule.
+
+    Args:
+        polygons (np.ndarray): Polygons of shape (K, N, 2).
+        points (np.ndarray): One point per polygon, of shape (K, 2).
+    Returns:
+        np.ndarray: boolean array of shape (K,), True for the points inside their polygon
+    """
+    p1, p2 = polygons, np.roll(polygons, -1, axis=1)
+    x, y = points[:, None, 0], points[:, None, 1]
+    spans = (p1[..., 1] > y) != (p2[..., 1] > y)
+    dy = np.where(spans, p2[..., 1] - p1[..., 1], 1)
+    crossings = spans & (x < p1[..., 0] + (p2[..., 0] - p1[..., 0]) * (y - p1[..., 1]) / dy)
+    return crossings.sum(axis=1) % 2 == 1
+
+
+def _union(parent: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    # Union-find on arrays: hook the larger root of each pair onto the smaller
+    # one and compress the paths, until both polygons of every pair share a root.
+    while True:
+        root_i, root_j = parent[i], parent[j]
+        different = root_i != root_j
+        if not different.any():
+            return parent
+        np.minimum.at(parent, np.maximum(root_i, root_j)[different], np.minimum(root_i, root_j)[different])
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+
+def _polygons_touch(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    # Polygons of shapes (K, N, 2) and (K, M, 2). Only the pairs of edges whose
+    # bounding boxes are closer than the tolerance are tested exactly.
+    a1, a2 = a, np.roll(a, -1, axis=1)
+    b1, b2 = b, np.roll(b, -1, axis=1)
+    a_low, a_high = np.minimum(a1, a2) - tolerance, np.maximum(a1, a2) + tolerance
+    b_low, b_high = np.minimum(b1, b2), np.maximum(b1, b2)
+    near_boxes = (
+        (a_low[:, :, None, 0] <= b_high[:, None, :, 0])
+        & (b_low[:, None, :, 0] <= a_high[:, :, None, 0])
+        & (a_low[:, :, None, 1] <= b_high[:, None, :, 1])
+        & (b_low[:, None, :, 1] <= a_high[:, :, None, 1])
+    )
+    k, n, m = np.nonzero(near_boxes)
+    p1, p2, q1, q2 = a1[k, n], a2[k, n], b1[k, m], b2[k, m]
+    dp, dq = p2 - p1, q2 - q1
+    crossing = (_cross(dp, q1 - p1) * _cross(dp, q2 - p1) < 0) & (
+        _cross(dq, p1 - q1) * _cross(dq, p2 - q1) < 0
+    )
+    squared_tolerance = tolerance**2
+    near = (
+        (squared_segment_distance(q1, p1, p2) <= squared_tolerance)
+        | (squared_segment_distance(q2, p1, p2) <= squared_tolerance)
+        | (squared_segment_distance(p1, q1, q2) <= squared_tolerance)
+        | (squared_segment_distance(p2, q1, q2) <= squared_tolerance)
+    )
+    result = np.zeros(len(a), dtype=bool)
+    result[k[crossing | near]] = True
+    return result | contains(a, b[:, 0]) | contains(b, a[:, 0])
+
+
+def _cross(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
@@ -0,0 +1,257 @@
+from dataclasses import dataclass
+import numpy as np
+from SimpleQubit import DEFAULT_GRID
+from SimpleQubitBatch import SimpleQubitBatch
+
+# Components of SimpleQubitBatch.components() which are circles, the others being rectangles.
+CIRCLES = ("connection_1", "connection_2")
+
+
+@dataclass
+class MinWidth:
+    """
+    The smallest dimension of a component, its diameter for a pad, must be at least value.
+    """
+
+    component: str
+    value: float
+    vectorized = True
+
+    @property
+    def name(self) -> str:
+        return f"min_width({self.component})"
+
+    def evaluate(self, shapes: dict) -> np.ndarray:
+        return _width(shapes[self.component]) >= self.value
+
+
+@dataclass
+class MinSpacing:
+    """
+    The distance between two components must be at least value.
+    """
+
+    first: str
+    second: str
+    value: float
+    vectorized = True
+
+    @property
+    def name(self) -> str:
+        return f"min_spacing({self.first}, {self.second})"
+
+    def evaluate(self, shapes: dict) -> np.ndarray:
+        return _distance(shapes[self.first], shapes[self.second]) >= self.value
+
+
+@dataclass
+class Overlap:
+    """
+    Two components must overlap or touch, so that they are connected.
+    """
+
+    first: str
+    second: str
+    vectorized = True
+
+    @property
+    def name(self) -> str:
+        return f"overlap({self.first}, {self.second})"
+
+    def evaluate(self, shapes: dict) -> np.ndarray:
+        return _distance(shapes[self.first], shapes[self.second]) <= 0
+
+
+@dataclass
+class Enclosure:
+    """
+    A component must be inside another one, with at least margin between
+    their boundaries. When the outer component is a rectangle, axis "x" or
+    "y" restricts the rule to the extent of the components along that axis.
+    """
+
+    inner: str
+    outer: str
+    margin: float = 0.0
+    axis: str = None
+    vectorized = True
+
+    @property
+    def name(self) -> str:
+        axis = f", {self.axis}" if self.axis else ""
+        return f"enclosure({self.inner}, {self.outer}{axis})"
+
+    def evaluate(self, shapes: dict) -> np.ndarray:
+        return _enclosure(shapes[self.inner], shapes[self.outer], self.axis) >= self.margin
+
+
+@dataclass
+class Connected:
+    """
+    All polygons of the drawn qubit must form a single region. This rule
+    needs the polygons, so it is checked by drawing each qubit.
+    """
+
+    tolerance: float = None
+    vectorized = False
+
+    @property
+    def name(self) -> str:
+        return "connected"
+
+    def evaluate_qubit(self, qubit) -> bool:
+        return qubit.is_connected(self.tolerance)
+
+
+def default_rules(grid: float = DEFAULT_GRID) -> list:
+    """
+    Get the rules which every SimpleQubit design is expected to follow:
+    components at least one grid step wide, wires connected to the junction
+    along its width and to their pad, and the two sides of the junction
+    separated by at least one grid step.
+
+    Args:
+        grid (float): The database grid of the layout.
+    Returns:
+        list: rules for DesignRuleChecker
+    """
+    return [
+        *(MinWidth(component, grid) for component in ("junction", "wire_1", "connection_1")),
+        Enclosure("wire_1", "junction", axis="x"),
+        Enclosure("wire_2", "junction", axis="x"),
+        Overlap("wire_1", "junction"),
+        Overlap("wire_2", "junction"),
+        Overlap("connection_1", "wire_1"),
+        Overlap("connection_2", "wire_2"),
+        MinSpacing("connection_1", "connection_2", grid),
+        MinSpacing("connection_1", "wire_2", grid),
+        MinSpacing("connection_2", "wire_1", grid),
+        Connected(),
+    ]
+
+
+class DesignRuleChecker:
+    """
+    This class checks design rules on the points of a SimpleQubitBatch. The
+    rules on widths, spacings, overlaps and enclosures are evaluated on the
+    exact geometry computed from the parameter arrays, for all points at
+    once. Rules which need polygons are only checked on the points which
+    pass all the others, so invalid designs are pruned before anything is
+    drawn.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = default_rules() if rules is None else list(rules)
+
+    def check(self, batch: SimpleQubitBatch, prune: bool = True) -> dict:
+        """
+        Evaluate the rules on all points of a batch.
+
+        Args:
+            batch (SimpleQubitBatch): The designs to check.
+            prune (bool): If True, rules which need polygons are only checked
+                on the points which pass the vectorized rules, and reported
+                as failing on the others.
+        Returns:
+            dict: for each rule name, a boolean array which is True for the
+                points which pass the rule
+        """
+        shapes = _shapes(batch)
+        results = {}
+        passing = np.ones(len(batch), dtype=bool)
+        for rule in self.rules:
+            if rule.vectorized:
+                results[rule.name] = np.asarray(rule.evaluate(shapes), dtype=bool)
+                passing &= results[rule.name]
+        for rule in self.rules:
+            if not rule.vectorized:
+                indices = np.flatnonzero(passing) if prune else np.arange(len(batch))
+                result = np.zeros(len(batch), dtype=bool)
+                qubits = batch.to_qubits(indices)
+                for qubit in qubits:
+                    # Checked points are all different, caching them would only evict useful layouts.
+                    qubit.layout_cache = None
+                result[indices] = [rule.evaluate_qubit(qubit) for qubit in qubits]
+                results[rule.name] = result
+                if prune:
+                    passing &= result
+        return results
+
+    def valid(self, batch: SimpleQubitBatch) -> np.ndarray:
+        """
+        Find the points of a batch which pass all rules.
+
+        Args:
+            batch (SimpleQubitBatch): The designs to check.
+        Returns:
+            np.ndarray: boolean array, True for the valid points
+        """
+        passing = np.ones(len(batch), dtype=bool)
+        for result in self.check(batch).values():
+            passing &= result
+        return passing
+
+    def prune(self, batch: SimpleQubitBatch) -> SimpleQubitBatch:
+        """
+        Keep the points of a batch which pass all rules.
+
+        Args:
+            batch (SimpleQubitBatch): The designs to check.
+        Returns:
+            SimpleQubitBatch: batch of the valid points, in the same order
+        """
+        valid = self.valid(batch)
+        return SimpleQubitBatch(**{name: values[valid] for name, values in batch.parameters.items()})
+
+
+def _shapes(batch: SimpleQubitBatch) -> dict:
+    # Bounding box of each component and whether it is a circle.
+    return {
+        name: (name in CIRCLES, component["bounding_box"])
+        for name, component in batch.components().items()
+    }
+
+
+def _width(shape) -> np.ndarray:
+    _, box = shape
+    return np.minimum(box[:, 1, 0] - box[:, 0, 0], box[:, 1, 1] - box[:, 0, 1])
+
+
+def _circle(box: np.ndarray) -> tuple:
+    return (box[:, 0] + box[:, 1]) / 2, (box[:, 1, 0] - box[:, 0, 0]) / 2
+
+
+def _distance(first, second) -> np.ndarray:
+    # Distance between the boundaries of two components, 0 or less when they overlap.
+    (first_circle, first_box), (second_circle, second_box) = first, second
+    if first_circle and second_circle:
+        (first_center, first_radius), (second_center, second_radius) = (
+            _circle(first_box),
+            _circle(second_box),
+        )
+        return np.hypot(*(first_center - second_center).T) - first_radius - second_radius
+    if first_circle or second_circle:
+        circle_box, box = (first_box, second_box) if first_circle else (second_box, first_box)
+        center, radius = _circle(circle_box)
+        gap = np.maximum(np.maximum(box[:, 0] - center, center - box[:, 1]), 0)
+        return np.hypot(*gap.T) - radius
+    gap = np.maximum(np.maximum(second_box[:, 0] - first_box[:, 1], first_box[:, 0] - second_box[:, 1]), 0)
+    return np.hypot(*gap.T)
+
+
+def _enclosure(inner, outer, axis: str = None) -> np.ndarray:
+    # Smallest distance from the boundary of the inner component to the
+    # boundary of the outer one, negative when it is not enclosed.
+    (inner_circle, inner_box), (outer_circle, outer_box) = inner, outer
+    if outer_circle:
+        center, radius = _circle(outer_box)
+        if inner_circle:
+            inner_center, inner_radius = _circle(inner_box)
+            return radius - np.hypot(*(inner_center - center).T) - inner_radius
+        # The farthest corner of the rectangle from the center.
+        far = np.maximum(np.abs(inner_box[:, 0] - center), np.abs(inner_box[:, 1] - center))
+        return radius - np.hypot(*far.T)
+    margins = np.minimum(inner_box[:, 0] - outer_box[:, 0], outer_box[:, 1] - inner_box[:, 1])
+    if axis is None:
+        return np.minimum(margins[:, 0], margins[:, 1])
+    return margins[:, {"x": 0, "y": 1}[axis]]
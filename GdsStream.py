@@ -0,0 +1,280 @@
+import contextlib
+import copy
+import datetime
+import io
+import math
+import mmap
+import struct
+import gdspy
+import numpy as np
+from SimpleQubit import SimpleQubit, open_compressed, open_stream
+
+# Record types, with their data type in the low byte.
+UNITS = 0x0305
+STRNAME = 0x0606
+ENDSTR = 0x0700
+BOUNDARY = 0x0800
+SREF = 0x0A00
+AREF = 0x0B00
+LAYER = 0x0D02
+DATATYPE = 0x0E02
+XY = 0x1003
+ENDEL = 0x1100
+SNAME = 0x1206
+STRANS = 0x1A01
+MAG = 0x1B05
+ANGLE = 0x1C05
+
+
+class GdsStreamWriter:
+    """
+    This class writes a GDSII stream incrementally: the library header when it
+    is opened, each cell as soon as it is written and the footer when it is
+    closed. Only the cells being written are held in memory, so the memory
+    use does not depend on the size of the layout.
+    """
+
+    def __init__(
+        self,
+        outfile,
+        name: str = "library",
+        unit: float = 1e-6,
+        precision: float = 1e-9,
+        timestamp: datetime.datetime = None,
+        compression: str = None,
+    ):
+        self.name = name
+        self.unit = unit
+        self.precision = precision
+        self.timestamp = datetime.datetime.today() if timestamp is None else timestamp
+        self.cell_names = set()
+        # Closes the file on close() if it was opened here.
+        self._exit_stack = contextlib.ExitStack()
+        self._stream = self._exit_stack.enter_context(open_stream(outfile, "wb", compression))
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_cell(self, cell: gdspy.Cell) -> None:
+        """
+        Write one cell. Referenced cells are not written, so they must be
+        written separately, before or after.
+
+        Args:
+            cell (gdspy.Cell): The cell to write.
+        Raises:
+            ValueError: If a cell with the same name has already been written.
+        Returns:
+            None
+        """
+        if cell.name in self.cell_names:
+            raise ValueError(f"Cell named {cell.name} has already been written.")
+        self.cell_names.add(cell.name)
+        cell.to_gds(self._stream, self.unit / self.precision, timestamp=self.timestamp)
+
+    def write_qubit(self, qubit: SimpleQubit, name: str) -> None:
+        """
+        Write the cells of a qubit, renamed so that several qubits can share
+        the stream: the CIRCUIT cell is written as name and each cell it
+        depends on as name_<cell name>.
+
+        Args:
+            qubit (SimpleQubit): The qubit to write.
+            name (str): Name of the qubit cell in the stream.
+        Returns:
+            None
+        """
+        layout = qubit.draw()
+        renamed = {}
+        for cell in layout.get_dependencies(recursive=True):
+            renamed[cell.name] = f"{name}_{cell.name}"
+        renamed[layout.name] = name
+        for cell in [*layout.get_dependencies(recursive=True), layout]:
+            self.write_cell(_renamed_cell(cell, renamed))
+
+    def close(self) -> None:
+        """
+        Write the footer of the stream and close the file if it was opened here.
+
+        Returns:
+            None
+        """
+        if self._stream is None:
+            return
+        self._stream.write(struct.pack(">2H", 4, 0x0400))
+        self._exit_stack.close()
+        self._stream = None
+
+    def _write_header(self) -> None:
+        now = self.timestamp
+        name = self.name if len(self.name) % 2 == 0 else (self.name + "\0")
+        date = (now.year, now.month, now.day, now.hour, now.minute, now.second)
+        self._stream.write(
+            struct.pack(">5H12h2H", 6, 0x0002, 0x0258, 28, 0x0102, *date, *date, 4 + len(name), 0x0206)
+            + name.encode("ascii")
+            + struct.pack(">2H", 20, 0x0305)
+            + _eight_byte_real(self.precision / self.unit)
+            + _eight_byte_real(self.precision)
+        )
+
+
+class GdsReader:
+    """
+    This class reads selected cells of a GDSII file. The file is memory-mapped
+    and the records of the other cells are skipped without being decoded, so
+    reading a few cells does not depend on the size of the library. Compressed
+    files are decompressed in memory instead.
+    """
+
+    def __init__(self, filename: str, compression: str = None):
+        self.filename = filename
+        self._file = None
+        self._map = None
+        stream = open_compressed(filename, "rb", compression)
+        if isinstance(stream, io.BufferedReader):
+            self._file = stream
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data = self._map
+        else:
+            with stream:
+                self._data = stream.read()
+        self.multiplier = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_cells(self, names) -> dict:
+        """
+        Decode the polygons and references of some cells. Scanning stops as
+        soon as all of them have been read.
+
+        Args:
+            names: Names of the cells to read.
+        Returns:
+            dict: for each cell found, a dict with a list of "polygons" as
+                (layer, datatype, points) tuples and a list of "references" as
+                dicts with the keys name, origin, rotation, magnification and
+                x_reflection, all in user units
+        """
+        remaining = set(names)
+        cells = {}
+        data = self._data
+        cell = None
+        element = None
+        position = 0
+        while (remaining or cell is not None) and position + 4 <= len(data):
+            size, record = struct.unpack_from(">HH", data, position)
+            if size < 4:
+                raise ValueError(f"Invalid record of size {size} at byte {position}.")
+            body = position + 4
+            end = position + size
+            if record == UNITS:
+                self.multiplier = round(1 / _eight_byte_real_to_float(data[body : body + 8]))
+            elif record == STRNAME:
+                name = bytes(data[body:end]).rstrip(b"\0").decode("ascii")
+                cell = {"polygons": [], "references": []} if name in remaining else None
+                if cell is not None:
+                    cells[name] = cell
+                    remaining.discard(name)
+            elif record == ENDSTR:
+                cell = None
+            elif cell is None:
+                pass
+            elif record == BOUNDARY:
+                element = {"type": "polygon", "layer": 0, "datatype": 0}
+            elif record in (SREF, AREF):
+                element = {
+                    "type": "reference",
+                    "rotation": 0.0,
+                    "magnification": 1.0,
+                    "x_reflection": False,
+                }
+            elif element is None:
+                pass
+            elif record == LAYER:
+                element["layer"] = struct.unpack_from(">h", data, body)[0]
+            elif record == DATATYPE:
+                element["datatype"] = struct.unpack_from(">h", data, body)[0]
+            elif record == SNAME:
+                element["name"] = bytes(data[body:end]).rstrip(b"\0").decode("ascii")
+            elif record == STRANS:
+                element["x_reflection"] = bool(struct.unpack_from(">H", data, body)[0] & 0x8000)
+            elif record == MAG:
+                element["magnification"] = _eight_byte_real_to_float(data[body : body + 8])
+            elif record == ANGLE:
+                element["rotation"] = _eight_byte_real_to_float(data[body : body + 8])
+            elif record == XY:
+                points = np.frombuffer(data, ">i4", (size - 4) // 4, body).reshape(-1, 2)
+                element["points"] = points / self.multiplier
+            elif record == ENDEL:
+                if element["type"] == "polygon":
+                    # The last point of a boundary repeats the first one.
+                    cell["polygons"].append((element["layer"], element["datatype"], element["points"][:-1]))
+                else:
+                    cell["references"].append(
+                        {
+                            "name": element["name"],
+                            "origin": tuple(element["points"][0]),
+                            "rotation": element["rotation"],
+                            "magnification": element["magnification"],
+                            "x_reflection": element["x_reflection"],
+                        }
+                    )
+                element = None
+            position = end
+        return cells
+
+    def close(self) -> None:
+        """
+        Release the memory map and close the file.
+
+        Returns:
+            None
+        """
+        self._data = b""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _renamed_cell(cell: gdspy.Cell, names: dict) -> gdspy.Cell:
+    # Shallow copy which shares the polygons with the original cell.
+    renamed = gdspy.Cell(names[cell.name], exclude_from_current=True)
+    renamed.polygons = cell.polygons
+    renamed.paths = cell.paths
+    renamed.labels = cell.labels
+    for reference in cell.references:
+        reference = copy.copy(reference)
+        reference.ref_cell = names[reference.ref_cell.name]
+        renamed.references.append(reference)
+    return renamed
+
+
+def _eight_byte_real_to_float(value: bytes) -> float:
+    exponent = (value[0] & 0x7F) - 64
+    mantissa = int.from_bytes(value[1:8], "big") / (1 << 56)
+    return (-mantissa if value[0] & 0x80 else mantissa) * 16.0**exponent
+
+
+def _eight_byte_real(value: float) -> bytes:
+    # GDSII excess-64 base-16 floating point number.
+    if value == 0:
+        return bytes(8)
+    sign = 0x80 if value < 0 else 0x00
+    value = abs(value)
+    exponent = math.floor(math.log(value, 16)) + 1
+    mantissa = int(round(value * 16.0 ** (14 - exponent)))
+    if mantissa >= 1 << 56:
+        mantissa //= 16
+        exponent += 1
+    return bytes([sign | (exponent + 64)]) + mantissa.to_bytes(7, "big")
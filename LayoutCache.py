@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+
+# Rough per-object overhead of a gdspy polygon or reference, in bytes.
+OBJECT_OVERHEAD = 200
+
+
+class LayoutCache:
+    """
+    This class defines a bounded least-recently-used cache of drawn layouts.
+    It is shared by all SimpleQubit instances so that qubits with identical
+    parameters pay the geometry cost once.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Look up a layout and mark it as most recently used.
+
+        Args:
+            key (tuple): Canonical parameters of the layout.
+        Returns:
+            The cached value, or None if the key is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int) -> None:
+        """
+        Store a layout, evicting the least recently used ones to stay in budget.
+
+        Args:
+            key (tuple): Canonical parameters of the layout.
+            value: The drawn layout.
+            size (int): Estimated memory footprint of the layout in bytes.
+        Returns:
+            None
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            self._evict()
+
+    def discard(self, key) -> None:
+        """
+        Remove a layout if it is cached.
+
+        Args:
+            key (tuple): Canonical parameters of the layout.
+        Returns:
+            None
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def resize(self, max_bytes: int = None, max_entries: int = None) -> None:
+        """
+        Change the memory budget, evicting layouts if the new budget is smaller.
+
+        Args:
+            max_bytes (int): New memory budget in bytes. Unchanged if None.
+            max_entries (int): New maximum number of layouts. Unchanged if None.
+        Returns:
+            None
+        """
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all layouts and reset the counters.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, entries, current_bytes and max_bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "current_bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _evict(self) -> None:
+        while self._entries and (
+            self.current_bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+def estimate_library_size(gds_library) -> int:
+    """
+    Estimate the memory footprint of a gds library from its polygon data.
+
+    Args:
+        gds_library (gdspy.GdsLibrary): The library to measure.
+    Returns:
+        int: Approximate size in bytes.
+    """
+    size = 0
+    for cell in gds_library.cells.values():
+        for polygon_set in cell.polygons:
+            size += OBJECT_OVERHEAD + sum(p.nbytes for p in polygon_set.polygons)
+        size += OBJECT_OVERHEAD * (1 + len(cell.references))
+    return size
+
+
+# Process-wide cache used by SimpleQubit.draw().
+LAYOUT_CACHE = LayoutCache()
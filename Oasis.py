@@ -0,0 +1,315 @@
+import contextlib
+import math
+import struct
+from collections import defaultdict
+import gdspy
+from SimpleQubit import open_stream
+
+MAGIC = b"%SEMI-OASIS\r\n"
+
+# Record identifiers.
+START = 1
+END = 2
+CELL = 14
+PLACEMENT = 17
+PLACEMENT_TRANSFORMED = 18
+TEXT = 19
+RECTANGLE = 20
+POLYGON = 21
+
+# Length of the END record, which is padded to this size.
+END_RECORD_SIZE = 256
+
+
+class OasisWriter:
+    """
+    This class writes cells to an OASIS file, one cell at a time like
+    GdsStreamWriter. Identical placements and polygons of a cell, as well as
+    gdspy.CellArray references, are written once with a repetition, which is
+    what makes OASIS files of regular layouts much smaller than GDSII.
+    """
+
+    def __init__(
+        self,
+        outfile,
+        unit: float = 1e-6,
+        precision: float = 1e-9,
+        compression: str = None,
+    ):
+        self.unit = unit
+        self.precision = precision
+        self.multiplier = unit / precision
+        self.cell_names = set()
+        # Closes the file on close() if it was opened here.
+        self._exit_stack = contextlib.ExitStack()
+        self._stream = self._exit_stack.enter_context(open_stream(outfile, "wb", compression))
+        # Grid steps per micron.
+        grid = 1e-6 / precision
+        self._stream.write(
+            MAGIC
+            + _uint(START)
+            + _string("1.0")
+            + _real(round(grid) if math.isclose(grid, round(grid)) else grid)
+            # Offset flag 0 and six empty name tables.
+            + _uint(0)
+            + _uint(0) * 12
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_library(self, gds_library: gdspy.GdsLibrary) -> None:
+        """
+        Write all cells of a gds library.
+
+        Args:
+            gds_library (gdspy.GdsLibrary): The library to write.
+        Returns:
+            None
+        """
+        for cell in gds_library.cells.values():
+            self.write_cell(cell)
+
+    def write_cell(self, cell: gdspy.Cell) -> None:
+        """
+        Write one cell. Referenced cells are not written, so they must be
+        written separately, before or after.
+
+        Args:
+            cell (gdspy.Cell): The cell to write.
+        Raises:
+            ValueError: If a cell with the same name has already been written.
+        Returns:
+            None
+        """
+        if cell.name in self.cell_names:
+            raise ValueError(f"Cell named {cell.name} has already been written.")
+        self.cell_names.add(cell.name)
+        records = [_uint(CELL), _string(cell.name)]
+
+        # Polygons with the same layer, datatype and shape are grouped.
+        shapes = defaultdict(list)
+        polygon_sets = list(cell.polygons) + [path.to_polygonset() for path in cell.paths]
+        for polygon_set in polygon_sets:
+            if polygon_set is None:
+                continue
+            for points, layer, datatype in zip(
+                polygon_set.polygons, polygon_set.layers, polygon_set.datatypes
+            ):
+                points = [self._grid(point) for point in points]
+                x, y = points[0]
+                shape = tuple((px - x, py - y) for px, py in points)
+                shapes[(layer, datatype, shape)].append((x, y))
+        for (layer, datatype, shape), positions in shapes.items():
+            positions.sort(key=lambda position: (position[1], position[0]))
+            records.append(_geometry(layer, datatype, shape, positions))
+
+        for label in cell.labels:
+            x, y = self._grid(label.position)
+            records.append(
+                _uint(TEXT)
+                + bytes([0b01011011])
+                + _string(label.text)
+                + _uint(label.layer)
+                + _uint(label.texttype)
+                + _sint(x)
+                + _sint(y)
+            )
+
+        # Plain references with the same cell and transformation are grouped.
+        placements = defaultdict(list)
+        for reference in cell.references:
+            name = reference.ref_cell if isinstance(reference.ref_cell, str) else reference.ref_cell.name
+            transformation = (
+                name,
+                reference.rotation or 0,
+                reference.magnification or 1,
+                bool(reference.x_reflection),
+            )
+            origin = self._grid(reference.origin)
+            if isinstance(reference, gdspy.CellArray):
+                records.append(
+                    _placement(*transformation, origin, self._array_repetition(reference))
+                )
+            else:
+                placements[transformation].append(origin)
+        for transformation, positions in placements.items():
+            positions.sort(key=lambda position: (position[1], position[0]))
+            records.append(_placement(*transformation, positions[0], _repetition(positions)))
+        self._stream.write(b"".join(records))
+
+    def close(self) -> None:
+        """
+        Write the END record and close the file if it was opened here.
+
+        Returns:
+            None
+        """
+        if self._stream is None:
+            return
+        # END record: padding string then validation scheme 0 (none). The record
+        # identifier, the two-byte padding length and the scheme take 4 bytes.
+        padding = END_RECORD_SIZE - 4
+        self._stream.write(_uint(END) + _uint(padding) + bytes(padding) + _uint(0))
+        self._exit_stack.close()
+        self._stream = None
+
+    def _grid(self, point) -> tuple:
+        return (int(round(point[0] * self.multiplier)), int(round(point[1] * self.multiplier)))
+
+    def _array_repetition(self, array: gdspy.CellArray) -> bytes:
+        angle = math.radians(array.rotation or 0)
+        cos, sin = math.cos(angle), math.sin(angle)
+        x_space, y_space = array.spacing
+        if array.x_reflection:
+            y_space = -y_space
+        column = self._grid((x_space * cos, x_space * sin))
+        row = self._grid((-y_space * sin, y_space * cos))
+        positions = [
+            (column[0] * i + row[0] * j, column[1] * i + row[1] * j)
+            for j in range(array.rows)
+            for i in range(array.columns)
+        ]
+        if array.columns >= 2 and array.rows >= 2:
+            if column[1] == 0 and row[0] == 0 and column[0] > 0 and row[1] > 0:
+                return _uint(1) + _uint(array.columns - 2) + _uint(array.rows - 2) + _uint(column[0]) + _uint(row[1])
+            return (
+                _uint(8)
+                + _uint(array.columns - 2)
+                + _uint(array.rows - 2)
+                + _gdelta(*column)
+                + _gdelta(*row)
+            )
+        return _repetition(positions)
+
+
+def _geometry(layer: int, datatype: int, shape: tuple, positions: list) -> bytes:
+    # Write a rectangle when the shape is an axis-aligned box.
+    x, y = positions[0]
+    xs = sorted({px for px, _ in shape})
+    ys = sorted({py for _, py in shape})
+    repetition = _repetition(positions)
+    is_box = (
+        len(shape) == 4
+        and len(xs) == 2
+        and len(ys) == 2
+        and all(
+            (shape[i][0] == shape[i - 1][0]) != (shape[i][1] == shape[i - 1][1])
+            for i in range(4)
+        )
+    )
+    if is_box:
+        info = 0b01111011 | (0b100 if repetition else 0)
+        return (
+            _uint(RECTANGLE)
+            + bytes([info])
+            + _uint(layer)
+            + _uint(datatype)
+            + _uint(xs[1] - xs[0])
+            + _uint(ys[1] - ys[0])
+            + _sint(x + xs[0])
+            + _sint(y + ys[0])
+            + repetition
+        )
+    deltas = b"".join(
+        _gdelta(shape[i][0] - shape[i - 1][0], shape[i][1] - shape[i - 1][1])
+        for i in range(1, len(shape))
+    )
+    info = 0b00111011 | (0b100 if repetition else 0)
+    return (
+        _uint(POLYGON)
+        + bytes([info])
+        + _uint(layer)
+        + _uint(datatype)
+        # Point list of type 4: general deltas between successive vertices.
+        + _uint(4)
+        + _uint(len(shape) - 1)
+        + deltas
+        + _sint(x)
+        + _sint(y)
+        + repetition
+    )
+
+
+def _placement(
+    name: str, rotation: float, magnification: float, x_reflection: bool, origin: tuple, repetition: bytes
+) -> bytes:
+    flags = (0b10000000 | 0b00110000) | (0b1000 if repetition else 0) | (1 if x_reflection else 0)
+    if magnification == 1 and rotation % 90 == 0:
+        flags |= (int(rotation // 90) % 4) << 1
+        record = _uint(PLACEMENT) + bytes([flags]) + _string(name)
+    else:
+        flags |= 0b110
+        record = (
+            _uint(PLACEMENT_TRANSFORMED)
+            + bytes([flags])
+            + _string(name)
+            + _real(magnification)
+            + _real(rotation)
+        )
+    return record + _sint(origin[0]) + _sint(origin[1]) + repetition
+
+
+def _repetition(positions: list) -> bytes:
+    # Repetition of the positions relative to the first one, empty for a single position.
+    if len(positions) < 2:
+        return b""
+    xs = sorted({x for x, _ in positions})
+    ys = sorted({y for _, y in positions})
+    x_steps = {b - a for a, b in zip(xs, xs[1:])}
+    y_steps = {b - a for a, b in zip(ys, ys[1:])}
+    # A full grid of distinct positions starting at its lower-left corner.
+    regular = (
+        len(x_steps) <= 1
+        and len(y_steps) <= 1
+        and len(set(positions)) == len(positions) == len(xs) * len(ys)
+        and positions[0] == (xs[0], ys[0])
+    )
+    if regular:
+        if len(ys) == 1:
+            return _uint(2) + _uint(len(xs) - 2) + _uint(x_steps.pop())
+        if len(xs) == 1:
+            return _uint(3) + _uint(len(ys) - 2) + _uint(y_steps.pop())
+        return _uint(1) + _uint(len(xs) - 2) + _uint(len(ys) - 2) + _uint(x_steps.pop()) + _uint(y_steps.pop())
+    return (
+        _uint(10)
+        + _uint(len(positions) - 2)
+        + b"".join(
+            _gdelta(x - px, y - py) for (px, py), (x, y) in zip(positions, positions[1:])
+        )
+    )
+
+
+def _uint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _sint(value: int) -> bytes:
+    return _uint((abs(value) << 1) | (1 if value < 0 else 0))
+
+
+def _string(value: str) -> bytes:
+    data = value.encode("ascii")
+    return _uint(len(data)) + data
+
+
+def _real(value: float) -> bytes:
+    if float(value).is_integer():
+        return _uint(0 if value >= 0 else 1) + _uint(abs(int(value)))
+    return _uint(7) + struct.pack("<d", value)
+
+
+def _gdelta(dx: int, dy: int) -> bytes:
+    # Second form of g-delta: x with sign in bit 1, then a signed y.
+    return _uint((abs(dx) << 2) | (0b10 if dx < 0 else 0) | 1) + _sint(dy)
@@ -0,0 +1,126 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# Stages recorded by SimpleQubit, in the order of a draw and export.
+STAGES = (
+    "library",
+    "tessellation",
+    "placement",
+    "validation",
+    "serialization",
+    "file_read",
+    "file_write",
+)
+
+
+@dataclass
+class StageSample:
+    """
+    Describe one run of a stage. The net allocated blocks are the change in
+    the number of memory blocks held by the interpreter: blocks allocated
+    and freed within the stage are not counted, and blocks of other threads
+    running at the same time are.
+    """
+
+    stage: str
+    wall_time: float
+    cpu_time: float
+    net_allocated_blocks: int
+
+
+class Profiler:
+    """
+    This class records the wall time, CPU time and memory growth of the stages
+    of SimpleQubit. It is opt-in: assign an instance to SimpleQubit.profiler,
+    or to the profiler attribute of a single qubit, to start recording.
+    """
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook) -> None:
+        """
+        Register a function called with the StageSample of each stage when it ends.
+
+        Args:
+            hook (callable): The function to call.
+        Returns:
+            None
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        """
+        Unregister a function registered with add_hook.
+
+        Args:
+            hook (callable): The function to remove.
+        Returns:
+            None
+        """
+        self.hooks.remove(hook)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure the code run in a with block as one run of a stage.
+
+        Args:
+            name (str): The name of the stage, usually one of STAGES.
+        Returns:
+            Context manager which records the stage when the block exits
+        """
+        blocks = sys.getallocatedblocks()
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(
+                StageSample(
+                    name,
+                    time.perf_counter() - start,
+                    time.thread_time() - cpu_start,
+                    sys.getallocatedblocks() - blocks,
+                )
+            )
+
+    def record(self, sample: StageSample) -> None:
+        """
+        Add a sample to the metrics and pass it to the hooks.
+
+        Args:
+            sample (StageSample): The measured run of a stage.
+        Returns:
+            None
+        """
+        with self._lock:
+            metrics = self.metrics.get(sample.stage)
+            if metrics is None:
+                metrics = self.metrics[sample.stage] = {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "net_allocated_blocks": 0,
+                }
+            metrics["calls"] += 1
+            metrics["wall_time"] += sample.wall_time
+            metrics["cpu_time"] += sample.cpu_time
+            metrics["net_allocated_blocks"] += sample.net_allocated_blocks
+        for hook in self.hooks:
+            hook(sample)
+
+    def reset(self) -> None:
+        """
+        Discard the recorded metrics. Hooks are kept.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.metrics = {}
@@ -0,0 +1,120 @@
+import numpy as np
+from SimpleQubit import SimpleQubit
+
+
+class QubitCatalog:
+    """
+    This class defines a catalog of SimpleQubit parameter sets stored in a
+    memory-mapped binary file. Qubits are accessed by index in constant time,
+    and slices and filters are views on the same file which do not copy records.
+    """
+
+    def __init__(self, records: np.ndarray, indices: np.ndarray = None):
+        self._records = records
+        self._indices = indices
+
+    @classmethod
+    def open(cls, filename: str):
+        """
+        Open a catalog file written by QubitCatalog.create or SimpleQubit.to_binary_file.
+
+        Args:
+            filename (str): The name of the catalog file.
+        Returns:
+            QubitCatalog: catalog of all qubits in the file
+        """
+        return cls(SimpleQubit.load_binary_file(filename, mmap=True))
+
+    @classmethod
+    def create(cls, filename: str, qubits):
+        """
+        Write a catalog file and open it.
+
+        Args:
+            filename (str): The name of the catalog file.
+            qubits: Iterable of SimpleQubit instances.
+        Returns:
+            QubitCatalog: catalog of all qubits in the file
+        """
+        SimpleQubit.to_binary_file(qubits, filename)
+        return cls.open(filename)
+
+    def __len__(self) -> int:
+        return len(self._records) if self._indices is None else len(self._indices)
+
+    def __getitem__(self, key):
+        """
+        Get one qubit by index, or a sub-catalog by slice, index array or boolean mask.
+        """
+        if isinstance(key, (int, np.integer)):
+            index = key if self._indices is None else self._indices[key]
+            return SimpleQubit.from_record(self._records[index])
+        if isinstance(key, slice) and self._indices is None:
+            return QubitCatalog(self._records[key])
+        indices = np.arange(len(self)) if self._indices is None else self._indices
+        return QubitCatalog(self._records, indices[key])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def indices(self) -> np.ndarray:
+        """
+        Positions of the qubits of the catalog in the catalog file.
+        """
+        return np.arange(len(self._records)) if self._indices is None else self._indices
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        Structured array of the parameters of the qubits of the catalog.
+        """
+        return self._records if self._indices is None else self._records[self._indices]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get the values of one parameter for all qubits of the catalog.
+
+        Args:
+            name (str): Name of the parameter, one of SimpleQubit.PARAMETERS.
+        Returns:
+            np.ndarray: one value per qubit
+        """
+        values = self._records[name]
+        return values if self._indices is None else values[self._indices]
+
+    def filter(self, **ranges):
+        """
+        Select the qubits whose parameters are in the given ranges, for example
+        catalog.filter(junction_width=(1.8, 2.2), wire_layer=1). Bounds are
+        inclusive and a bound of None is open.
+
+        Args:
+            **ranges: (low, high) tuple or exact value for each parameter by name.
+        Returns:
+            QubitCatalog: catalog of the matching qubits
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, bounds in ranges.items():
+            if name not in SimpleQubit.PARAMETERS:
+                raise ValueError(f"Unknown parameter: {name}")
+            values = self.column(name)
+            if isinstance(bounds, (tuple, list)):
+                low, high = bounds
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            else:
+                mask &= values == bounds
+        return self[np.flatnonzero(mask)]
+
+    def to_batch(self):
+        """
+        Get the qubits of the catalog as a batch, to compute their polygons at once.
+
+        Returns:
+            SimpleQubitBatch
+        """
+        return SimpleQubit.from_arrays(self.records)
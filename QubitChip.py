@@ -0,0 +1,130 @@
+import gdspy
+import numpy as np
+from Oasis import OasisWriter
+from SimpleQubit import SimpleQubit, open_stream
+
+
+class QubitChip:
+    """
+    This class defines a chip layout made of a regular array of identical qubits.
+    The qubit is drawn once and placed with a gdspy.CellArray, so the size of
+    the library does not grow with the number of qubits.
+    """
+
+    def __init__(
+        self,
+        qubit: SimpleQubit,
+        columns: int,
+        rows: int,
+        spacing: tuple = None,
+        margin: float = 10.0,
+        name: str = "CHIP",
+    ):
+        self.qubit = qubit
+        self.columns = columns
+        self.rows = rows
+        self.spacing = spacing
+        self.margin = margin
+        self.name = name
+        self.layout = None
+        self.gds_library = None
+        self._drawn_key = None
+
+    def get_spacing(self) -> tuple:
+        """
+        Get the distance between neighbouring qubits. Unless it was given, it is
+        the size of the qubit bounding box plus the margin.
+
+        Returns:
+            tuple: spacing along x and y
+        """
+        if self.spacing is not None:
+            return tuple(self.spacing)
+        (x_min, y_min), (x_max, y_max) = self.qubit.draw().get_bounding_box()
+        return (x_max - x_min + self.margin, y_max - y_min + self.margin)
+
+    def draw(self) -> gdspy.Cell:
+        """
+        Draw the chip in a gds library which contains the chip cell and the
+        cells of the qubit. The drawn cell is reused while the qubit and the
+        array stay unchanged.
+
+        Returns:
+            gdspy.Cell: Cell which contains the array of qubits
+        """
+        key = (self.qubit.geometry_hash(), self.columns, self.rows, self.get_spacing(), self.name)
+        if self.layout is not None and self._drawn_key == key:
+            return self.layout
+
+        qubit_layout = self.qubit.draw()
+        self.gds_library = gdspy.GdsLibrary()
+        layout = gdspy.Cell(self.name, exclude_from_current=True)
+        layout.add(gdspy.CellArray(qubit_layout, self.columns, self.rows, self.get_spacing()))
+        self.gds_library.add(layout, include_dependencies=True)
+        self.layout = layout
+        self._drawn_key = key
+        return self.layout
+
+    def get_polygon_arrays(self) -> dict:
+        """
+        Get the polygons of all qubits of the chip in the ragged array layout
+        of SimpleQubit.get_polygon_arrays, the qubit being placed row by row.
+        They are computed from the polygons of a single qubit, without
+        flattening the gdspy array.
+
+        Returns:
+            dict: for each layer, a tuple (vertices, offsets) of arrays with
+                shapes (V, 2) and (P + 1,)
+        """
+        x_space, y_space = self.get_spacing()
+        rows, columns = np.meshgrid(np.arange(self.rows), np.arange(self.columns), indexing="ij")
+        positions = np.stack([columns.reshape(-1) * x_space, rows.reshape(-1) * y_space], axis=-1)
+        arrays = {}
+        for layer, (vertices, offsets) in self.qubit.get_polygon_arrays().items():
+            chip_vertices = (positions[:, None, :] + vertices).reshape(-1, 2)
+            chip_offsets = (offsets[:-1] + len(vertices) * np.arange(len(positions))[:, None]).reshape(-1)
+            arrays[layer] = (chip_vertices, np.append(chip_offsets, len(chip_vertices)))
+        return arrays
+
+    def to_gds(self, filename: str = "chip.gds", compression: str = None) -> None:
+        """
+        Export the chip library to gds file, optionally compressed while it is written.
+
+        Args:
+            filename (str): This is the name of the file export, or a writable
+                binary stream, which is left open.
+            compression (str): "gzip", "zstd" or "none". If None, it is inferred
+                from the file extension (.gz or .zst). Only used for file names.
+        Returns:
+            None
+        """
+        self.draw()
+        with open_stream(filename, "wb", compression) as gds_file:
+            self.gds_library.write_gds(gds_file)
+
+    def to_oasis(self, filename: str = "chip.oas") -> None:
+        """
+        Export the chip library to OASIS file. The array of qubits is written
+        as a single placement with a repetition.
+
+        Args:
+            filename (str): This is the name of the file export.
+        Returns:
+            None
+        """
+        self.draw()
+        with OasisWriter(
+            filename, unit=self.gds_library.unit, precision=self.gds_library.precision
+        ) as writer:
+            writer.write_library(self.gds_library)
+
+    def to_svg(self, filename: str = "chip.svg") -> None:
+        """
+        Export the chip cell to svg file.
+
+        Args:
+            filename (str): This is the name of the file export.
+        Returns:
+            None
+        """
+        self.draw().write_svg(filename)
@@ -0,0 +1,138 @@
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import numpy as np
+from LayoutCache import estimate_library_size
+from SimpleQubit import SimpleQubit
+
+# Factor between the polygon data of a layout and the memory used to draw and write it.
+MEMORY_OVERHEAD = 8
+
+
+@dataclass
+class SweepResult:
+    index: int
+    parameters: dict
+    files: dict = field(default_factory=dict)
+
+
+class ParameterSweep:
+    """
+    This class runs SimpleQubit over a grid of parameters. Points are drawn and
+    exported in chunks on a process pool, and the number of chunks in flight is
+    bounded so that the sweep stays within a memory limit.
+    """
+
+    def __init__(
+        self,
+        grid: dict,
+        output_dir: str = ".",
+        formats: tuple = ("gds", "json"),
+        max_workers: int = None,
+        chunksize: int = 64,
+        memory_limit: int = 512 * 1024 * 1024,
+    ):
+        unknown = set(grid) - set(SimpleQubit.PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        missing = set(SimpleQubit.PARAMETERS) - set(grid)
+        if missing:
+            raise ValueError(f"Missing parameters: {', '.join(sorted(missing))}")
+        unknown = set(formats) - set(SimpleQubit.EXPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        # Scalars are parameters that are not swept. Values are converted to
+        # Python scalars, which the json export can serialize.
+        self.grid = {name: np.asarray(values).reshape(-1).tolist() for name, values in grid.items()}
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.max_workers = max_workers or os.cpu_count()
+        self.chunksize = chunksize
+        self.memory_limit = memory_limit
+
+    def __len__(self) -> int:
+        size = 1
+        for values in self.grid.values():
+            size *= len(values)
+        return size
+
+    def points(self):
+        """
+        Iterate over the points of the grid without building the full list.
+
+        Returns:
+            Iterator of (index, parameters) tuples
+        """
+        names = list(self.grid)
+        for index, values in enumerate(itertools.product(*self.grid.values())):
+            yield index, dict(zip(names, values))
+
+    def max_pending_chunks(self) -> int:
+        """
+        Get the number of chunks that may be in flight at once, from the memory
+        used by the first point of the grid.
+
+        Returns:
+            int: maximum number of submitted chunks that are not finished
+        """
+        _, parameters = next(self.points())
+        qubit = SimpleQubit(**parameters)
+        qubit.layout_cache = None
+        qubit.draw()
+        point_memory = MEMORY_OVERHEAD * estimate_library_size(qubit.gds_library)
+        return max(1, self.memory_limit // (point_memory * self.chunksize))
+
+    def iter_results(self):
+        """
+        Run the sweep, yielding results as chunks finish (not in grid order).
+
+        Returns:
+            Iterator of SweepResult
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        if len(self) == 0:
+            return
+        width = len(str(max(len(self) - 1, 0)))
+        max_pending = min(self.max_pending_chunks(), 2 * self.max_workers)
+        points = self.points()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            while True:
+                while len(pending) < max_pending:
+                    chunk = list(itertools.islice(points, self.chunksize))
+                    if not chunk:
+                        break
+                    pending.add(
+                        executor.submit(_run_chunk, chunk, self.formats, self.output_dir, width)
+                    )
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+    def run(self) -> list:
+        """
+        Run the sweep.
+
+        Returns:
+            list[SweepResult]: results sorted by grid index
+        """
+        return sorted(self.iter_results(), key=lambda result: result.index)
+
+
+def _run_chunk(chunk: list, formats: tuple, output_dir: str, width: int) -> list:
+    results = []
+    for index, parameters in chunk:
+        qubit = SimpleQubit(**parameters)
+        # Points of a sweep are all different, caching them would only evict useful layouts.
+        qubit.layout_cache = None
+        qubit.draw()
+        result = SweepResult(index, parameters)
+        for file_format in formats:
+            filename = os.path.join(output_dir, f"qubit_{index:0{width}d}.{file_format}")
+            getattr(qubit, SimpleQubit.EXPORT_FORMATS[file_format])(filename=filename)
+            result.files[file_format] = filename
+        results.append(result)
+    return results
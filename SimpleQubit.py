@@ -1,6 +1,55 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import gzip
+import hashlib
+import importlib.util
+import io
+import itertools
 import json
-import gdspy
-from jsonschema import validate, ValidationError
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from LayoutCache import LAYOUT_CACHE, estimate_library_size
+
+
+def _lazy_import(name: str):
+    """
+    Import a module which is only loaded when one of its attributes is first
+    used, so that json round-trips do not pay for importing gdspy, numpy and
+    jsonschema.
+
+    Args:
+        name (str): The name of the module.
+    Returns:
+        module: the module, loaded on first attribute access
+    Raises:
+        ModuleNotFoundError: If the module is not installed.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+gdspy = _lazy_import("gdspy")
+np = _lazy_import("numpy")
+jsonschema = _lazy_import("jsonschema")
+
+# Tessellation defaults, the same as gdspy.Round and gdspy.GdsLibrary.
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_MAX_POINTS = 199
+DEFAULT_GRID = 0.001
 
 
 class SimpleQubit:
@@ -9,6 +58,34 @@ class SimpleQubit:
     junction, wires, and connections.
     """
 
+    # Names of the constructor parameters that define the geometry, in order.
+    PARAMETERS = (
+        "connection_radius",
+        "junction_width",
+        "junction_height",
+        "junction_offset",
+        "wire_width",
+        "wire_height",
+        "wire_layer",
+        "junction_layer",
+        "connection_layer",
+    )
+    LAYER_PARAMETERS = ("wire_layer", "junction_layer", "connection_layer")
+
+    # Cache of drawn layouts shared by all instances. Set to None to disable.
+    layout_cache = LAYOUT_CACHE
+
+    # Export method for each file format, the format being the file extension.
+    EXPORT_FORMATS = {"gds": "to_gds", "oas": "to_oasis", "svg": "to_svg", "json": "to_json"}
+
+    # Check json data with a validator generated from the schema before falling
+    # back to jsonschema, which is only needed to report errors.
+    FAST_VALIDATION = True
+
+    # Profiler.Profiler which records the time and memory growth of each stage of
+    # drawing, validation and export. Set on the class or on an instance to enable.
+    profiler = None
+
     def __init__(
         self,
         connection_radius: float,
@@ -19,7 +96,13 @@ class SimpleQubit:
         wire_height: float,
         wire_layer: int,
         junction_layer: int,
-        connection_layer: int
+        connection_layer: int,
+        *,
+        tolerance: float = DEFAULT_TOLERANCE,
+        number_of_points: int = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        adaptive: bool = False,
+        grid: float = DEFAULT_GRID,
     ):
         self.connection_radius = connection_radius
         self.junction_width = junction_width
@@ -30,61 +113,249 @@ class SimpleQubit:
         self.wire_layer = wire_layer
         self.connection_layer = connection_layer
         self.junction_layer = junction_layer
+        # Tessellation of the connection pads, see get_number_of_points().
+        self.tolerance = tolerance
+        self.number_of_points = number_of_points
+        self.max_points = max_points
+        self.adaptive = adaptive
+        self.grid = grid
+        self.layout = None
+        self.gds_library = None
+        self._drawn_key = None
+        self._polygon_arrays = None
+        self._components = None
+
+    def parameter_values(self) -> tuple:
+        """
+        Get the canonical parameters of the circuit, with dimensions as floats
+        and layers as integers, so that equal designs produce equal values.
+
+        Returns:
+            tuple: parameter values in the order of SimpleQubit.PARAMETERS
+        """
+        return tuple(
+            int(getattr(self, name)) if name in self.LAYER_PARAMETERS else float(getattr(self, name))
+            for name in self.PARAMETERS
+        )
+
+    def cache_key(self) -> tuple:
+        """
+        Get the key of the drawn layout: the canonical parameters followed by
+        the tessellation settings of the connection pads.
+
+        Returns:
+            tuple: key which is equal for layouts drawn identically
+        """
+        return self.parameter_values() + (
+            float(self.tolerance),
+            self.get_number_of_points(),
+            int(self.max_points),
+        )
+
+    def get_number_of_points(self) -> int:
+        """
+        Get the number of vertices of the connection pads. If number_of_points
+        is set, it is used as is. In adaptive mode, it is the smallest multiple
+        of 4 which approximates the circle within the tolerance, never finer
+        than half the grid since smaller details are lost when snapping to it,
+        and never above max_points, so that pads are not fractured in several
+        polygons. Otherwise gdspy chooses it from the tolerance.
+
+        Returns:
+            int: number of vertices, or None to let gdspy choose
+        """
+        if self.number_of_points is not None:
+            return int(self.number_of_points)
+        if not self.adaptive:
+            return None
+        tolerance = max(self.tolerance, self.grid / 2)
+        if tolerance >= self.connection_radius:
+            return 4
+        number_of_points = math.ceil(math.pi / math.acos(1 - tolerance / self.connection_radius))
+        number_of_points = 4 * math.ceil(number_of_points / 4)
+        if self.max_points:
+            number_of_points = min(number_of_points, max(4, 4 * (self.max_points // 4)))
+        return number_of_points
+
+    def geometry_hash(self) -> str:
+        """
+        Compute a stable hash of the parameters that define the geometry.
+
+        Returns:
+            str: hex digest which only changes when one of the parameters changes
+        """
+        return hashlib.sha1(repr(self.cache_key()).encode("ascii")).hexdigest()
+
+    def invalidate(self) -> None:
+        """
+        Discard the drawn layout, here and in the shared layout cache, so that
+        the next call to draw() rebuilds it.
+
+        Returns:
+            None
+        """
+        if self.layout_cache is not None:
+            self.layout_cache.discard(self.cache_key())
         self.layout = None
         self.gds_library = None
+        self._drawn_key = None
+        self._polygon_arrays = None
+        self._components = None
 
     def draw(self) -> gdspy.Cell:
         """
-        Draw circuit in gds library
+        Draw circuit in gds library. The drawn cell is cached and returned as is
+        while the geometry parameters stay unchanged. Layouts are also shared
+        through SimpleQubit.layout_cache with other instances of equal parameters,
+        so the returned cells must be treated as read-only.
+
+        When only some parameters changed since the last drawing, only the
+        components which depend on them are rebuilt: for instance changing
+        junction_width rebuilds the junction rectangle and the placements of
+        the WIRE_CONNECTION cell, but reuses the cell and its round pad.
 
         Returns:
             gdspy.Cell: Cell from gds library which contains all components of circuit
         """
-        # The GDSII file is called a library, which contains multiple cells.
-        self.gds_library = gdspy.GdsLibrary()
-        layout = self.gds_library.new_cell("CIRCUIT")
-        repeated_component = self.gds_library.new_cell("WIRE_CONNECTION")
+        cache_key = self.cache_key()
+        if self.layout is not None and self._drawn_key == cache_key:
+            return self.layout
+
+        component_keys = self._component_keys(cache_key)
+        cached = self.layout_cache.get(cache_key) if self.layout_cache is not None else None
+        if cached is not None:
+            self.gds_library, self.layout = cached
+            self._drawn_key = cache_key
+            self._components = {
+                "wire_connection": (component_keys["wire_connection"], self.layout.references[0].ref_cell),
+                "junction": (component_keys["junction"], self.layout.polygons[0]),
+            }
+            return self.layout
+
+        # Components of the previous drawing are reused, never modified, since
+        # they may be shared with other layouts.
+        components = {}
+        for name, build in (
+            ("wire_connection", self._draw_wire_connection),
+            ("junction", self._draw_junction),
+        ):
+            previous = self._components.get(name) if self._components else None
+            if previous is not None and previous[0] == component_keys[name]:
+                components[name] = previous
+            else:
+                components[name] = (component_keys[name], build())
+        repeated_component = components["wire_connection"][1]
+
+        with _profile(self, "library"):
+            # The GDSII file is called a library, which contains multiple cells.
+            self.gds_library = gdspy.GdsLibrary()
+            # Cells are kept out of gdspy's global library so that redrawing does
+            # not collide with the cells of a previous drawing.
+            layout = gdspy.Cell("CIRCUIT", exclude_from_current=True)
+            self.gds_library.add([layout, repeated_component])
 
+        with _profile(self, "placement"):
+            # Create the layout using repeated components and junction.
+            wc1 = gdspy.CellReference(
+                repeated_component, (0 + self.junction_offset, self.junction_height)
+            )
+            wc2 = gdspy.CellReference(
+                repeated_component,
+                (self.junction_width - self.junction_offset, 0),
+                rotation=180,
+            )
+            layout.add([components["junction"][1], wc1, wc2])
+        self.layout = layout
+        self._drawn_key = cache_key
+        self._components = components
+        if self.layout_cache is not None:
+            self.layout_cache.put(
+                cache_key, (self.gds_library, layout), estimate_library_size(self.gds_library)
+            )
+        return self.layout
+
+    def _component_keys(self, cache_key: tuple) -> dict:
+        # Parts of the cache key which each component depends on.
+        values = dict(zip(self.PARAMETERS, cache_key))
+        return {
+            "wire_connection": tuple(
+                values[name]
+                for name in ("wire_width", "wire_height", "wire_layer", "connection_radius", "connection_layer")
+            )
+            + cache_key[len(self.PARAMETERS) :],
+            "junction": tuple(
+                values[name] for name in ("junction_width", "junction_height", "junction_layer")
+            ),
+        }
+
+    def _draw_wire_connection(self) -> gdspy.Cell:
         # Create a cell with a component that is used repeatedly.
+        repeated_component = gdspy.Cell("WIRE_CONNECTION", exclude_from_current=True)
         w = gdspy.Rectangle(
             (0, 0), (self.wire_width, self.wire_height), layer=self.wire_layer
         )
 
-        c = gdspy.Round(
-            (0, self.wire_height), self.connection_radius, layer=self.connection_layer
-        )
+        with _profile(self, "tessellation"):
+            c = gdspy.Round(
+                (0, self.wire_height),
+                self.connection_radius,
+                tolerance=self.tolerance,
+                number_of_points=self.get_number_of_points(),
+                max_points=self.max_points,
+                layer=self.connection_layer,
+            )
         repeated_component.add([c, w])
+        return repeated_component
 
-        # Create the layout using repeated components and junction.
-        j = gdspy.Rectangle(
+    def _draw_junction(self) -> gdspy.Rectangle:
+        return gdspy.Rectangle(
             (0, 0),
             (self.junction_width, self.junction_height),
             layer=self.junction_layer,
         )
-        wc1 = gdspy.CellReference(
-            repeated_component, (0 + self.junction_offset, self.junction_height)
-        )
-        wc2 = gdspy.CellReference(
-            repeated_component,
-            (self.junction_width - self.junction_offset, 0),
-            rotation=180,
-        )
-        layout.add([j, wc1, wc2])
-        self.layout = layout
-        return self.layout
 
-    def to_gds(self, filename: str = "output.gds") -> None:
+    def to_gds(self, filename: str = "output.gds", compression: str = None) -> None:
         """
-        Export GDS library to gds file.
+        Export GDS library to gds file, optionally compressed while it is written.
+
+        Args:
+            filename (str): This is the name of the file export, or a writable
+                binary stream, which is left open.
+            compression (str): "gzip", "zstd" or "none". If None, it is inferred
+                from the file extension (.gz or .zst). Only used for file names.
+        Returns:
+            None
+        """
+        self.draw()
+        if self.profiler is None:
+            with open_stream(filename, "wb", compression) as gds_file:
+                self.gds_library.write_gds(gds_file)
+            return
+        # When profiling, the library is serialized in memory first so that
+        # serialization and file write are measured separately.
+        with _profile(self, "serialization"):
+            buffer = io.BytesIO()
+            self.gds_library.write_gds(buffer)
+        with _profile(self, "file_write"):
+            with open_stream(filename, "wb", compression) as gds_file:
+                gds_file.write(buffer.getbuffer())
+
+    def to_oasis(self, filename: str = "output.oas") -> None:
+        """
+        Export GDS library to OASIS file.
 
         Args:
             filename (str): This is the name of the file export.
         Returns:
             None
         """
-        if not self.gds_library:
-            self.draw()
-        self.gds_library.write_gds(filename)
+        from Oasis import OasisWriter
+
+        self.draw()
+        with OasisWriter(
+            filename, unit=self.gds_library.unit, precision=self.gds_library.precision
+        ) as writer:
+            writer.write_library(self.gds_library)
 
     def to_svg(self, filename: str = "output.svg") -> None:
         """
@@ -95,10 +366,42 @@ class SimpleQubit:
         Returns:
             None
         """
-        if not self.layout:
-            self.draw()
+        self.draw()
+        if self.profiler is None:
+            self.layout.write_svg(filename)
+            return
+        with _profile(self, "serialization"):
+            buffer = io.StringIO()
+            self.layout.write_svg(buffer)
+        with _profile(self, "file_write"):
+            with open(filename, "w") as svg_file:
+                svg_file.write(buffer.getvalue())
+
+    def export(self, formats=("gds", "svg", "json"), basename: str = "output") -> dict:
+        """
+        Draw the circuit once, then export it to several file formats
+        concurrently on a thread pool.
+
+        Args:
+            formats: File formats to write, among SimpleQubit.EXPORT_FORMATS.
+            basename (str): Name of the files without extension.
+        Returns:
+            dict: time in seconds taken to write each format
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        unknown = set(formats) - set(self.EXPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        self.draw()
 
-        self.layout.write_svg(filename)
+        def write(file_format: str) -> float:
+            start = time.perf_counter()
+            getattr(self, self.EXPORT_FORMATS[file_format])(filename=f"{basename}.{file_format}")
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=max(1, len(formats))) as executor:
+            return dict(zip(formats, executor.map(write, formats)))
 
     def get_polygonsets(self) -> list:
         """
@@ -107,9 +410,91 @@ class SimpleQubit:
         Returns:
             list[PolygonSet]
         """
-        if not self.layout:
-            self.draw()
-        return self.layout.get_polygonsets()
+        return self.draw().get_polygonsets()
+
+    def get_polygon_arrays(self) -> dict:
+        """
+        Get all polygons of the circuit as one contiguous vertex buffer per
+        layer, in a ragged array layout: the vertices of polygon i of a layer
+        are vertices[offsets[i]:offsets[i + 1]]. The arrays are computed once
+        per drawing and are read-only.
+
+        Returns:
+            dict: for each layer, a tuple (vertices, offsets) of arrays with
+                shapes (V, 2) and (P + 1,)
+        """
+        layout = self.draw()
+        if self._polygon_arrays is not None and self._polygon_arrays[0] == self._drawn_key:
+            return self._polygon_arrays[1]
+        by_layer = {}
+        for (layer, _), polygons in layout.get_polygons(by_spec=True).items():
+            by_layer.setdefault(layer, []).extend(polygons)
+        arrays = {}
+        for layer, polygons in by_layer.items():
+            vertices = np.concatenate(polygons).astype(np.float64, copy=False)
+            offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+            np.cumsum([len(polygon) for polygon in polygons], out=offsets[1:])
+            vertices.flags.writeable = False
+            offsets.flags.writeable = False
+            arrays[layer] = (vertices, offsets)
+        self._polygon_arrays = (self._drawn_key, arrays)
+        return arrays
+
+    def is_connected(self, tolerance: float = None) -> bool:
+        """
+        Check that the components of the circuit, on all layers, form a single
+        connected region. Polygons which touch are connected.
+
+        Args:
+            tolerance (float): Largest gap between polygons which are connected.
+                If None, half of the grid, since smaller gaps are closed when
+                the layout is written.
+        Returns:
+            bool: True if the circuit is a single region
+        """
+        import Connectivity
+
+        if tolerance is None:
+            tolerance = self.grid / 2
+        return Connectivity.is_connected(self.get_polygon_arrays(), tolerance)
+
+    def get_components(self) -> dict:
+        """
+        Get the exact geometry of each component, computed from the parameters
+        without drawing or tessellating anything. The connection pads are
+        exact circles, so their area and perimeter are slightly larger than
+        those of the drawn polygons.
+
+        Returns:
+            dict[str, ComponentGeometry]: geometry of "junction", "wire_1",
+                "wire_2", "connection_1" and "connection_2", the second wire
+                and connection being rotated by 180 degrees
+        """
+        jw, jh, offset = self.junction_width, self.junction_height, self.junction_offset
+        ww, wh, r = self.wire_width, self.wire_height, self.connection_radius
+        # Origins of the two WIRE_CONNECTION references.
+        x1, y1 = offset, jh
+        x2, y2 = jw - offset, 0
+        return {
+            "junction": _rectangle_geometry(self.junction_layer, 0, 0, jw, jh),
+            "wire_1": _rectangle_geometry(self.wire_layer, x1, y1, x1 + ww, y1 + wh),
+            "wire_2": _rectangle_geometry(self.wire_layer, x2 - ww, y2 - wh, x2, y2),
+            "connection_1": _circle_geometry(self.connection_layer, x1, y1 + wh, r),
+            "connection_2": _circle_geometry(self.connection_layer, x2, y2 - wh, r),
+        }
+
+    def get_bounding_box(self) -> tuple:
+        """
+        Get the exact bounding box of the circuit from the parameters.
+
+        Returns:
+            tuple: ((x_min, y_min), (x_max, y_max))
+        """
+        boxes = [component.bounding_box for component in self.get_components().values()]
+        return (
+            (min(box[0][0] for box in boxes), min(box[0][1] for box in boxes)),
+            (max(box[1][0] for box in boxes), max(box[1][1] for box in boxes)),
+        )
 
     @classmethod
     def get_json_schema(cls):
@@ -162,6 +547,148 @@ class SimpleQubit:
         }
         return schema
 
+    @classmethod
+    def get_validator(cls):
+        """
+        Get the jsonschema validator of the class. The schema is checked and the
+        validator is created once per class.
+
+        Returns:
+            jsonschema.protocols.Validator: validator for the json schema
+        """
+        validator = cls.__dict__.get("_validator")
+        if validator is None:
+            schema = cls.get_json_schema()
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+            cls._validator = validator
+        return validator
+
+    @classmethod
+    def get_fast_validator(cls):
+        """
+        Get a validator function generated from the json schema of the class.
+
+        Returns:
+            callable: function which returns whether the data is valid, or None
+                if the schema uses keywords that are not supported
+        """
+        if "_fast_validator" not in cls.__dict__:
+            cls._fast_validator = _compile_fast_validator(cls.get_json_schema())
+        return cls._fast_validator
+
+    @classmethod
+    def validate(cls, data: dict) -> None:
+        """
+        Validate json data against the json schema of the class.
+
+        Args:
+            data (dict): The json data of an instance.
+        Raises:
+            ValidationError: If the data is not compliant with the schema.
+        Returns:
+            None
+        """
+        with _profile(cls, "validation"):
+            fast_validator = cls.get_fast_validator() if cls.FAST_VALIDATION else None
+            if fast_validator is None or not fast_validator(data):
+                cls.get_validator().validate(data)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the parameters of the instance into the fixed binary layout
+        BINARY_DTYPE.
+
+        Returns:
+            bytes: the binary record of the instance
+        """
+        return np.array(self.parameter_values(), dtype=binary_dtype()).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """
+        Deserialize a binary record. Initialize the class from its parameters.
+
+        Args:
+            data (bytes): The binary record of the instance.
+        Returns:
+            SimpleQubit: new instance of SimpleQubit
+        """
+        return cls.from_record(np.frombuffer(data, dtype=binary_dtype())[0])
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Initialize the class from one element of a structured array with the
+        fields of BINARY_DTYPE, such as a record of a binary file.
+
+        Args:
+            record (np.void): The record of the instance.
+        Returns:
+            SimpleQubit: new instance of SimpleQubit
+        """
+        return cls(**{name: record[name].item() for name in cls.PARAMETERS})
+
+    @classmethod
+    def to_records(cls, qubits) -> np.ndarray:
+        """
+        Convert instances of SimpleQubit to a structured array.
+
+        Args:
+            qubits: Iterable of SimpleQubit instances.
+        Returns:
+            np.ndarray: one record of BINARY_DTYPE per instance
+        """
+        return np.fromiter((qubit.parameter_values() for qubit in qubits), dtype=binary_dtype())
+
+    @classmethod
+    def to_binary_file(cls, qubits, filename: str, chunk_size: int = 65536) -> int:
+        """
+        Serialize many instances of SimpleQubit into a binary file which can be
+        memory-mapped by load_binary_file.
+
+        Args:
+            qubits: Iterable of SimpleQubit instances.
+            filename (str): The name of the file.
+            chunk_size (int): Number of instances converted at a time.
+        Returns:
+            int: number of instances written
+        """
+        count = 0
+        qubits = iter(qubits)
+        with open(filename, "wb") as binary_file:
+            binary_file.write(BINARY_MAGIC)
+            while True:
+                records = cls.to_records(itertools.islice(qubits, chunk_size))
+                if not len(records):
+                    break
+                binary_file.write(records.tobytes())
+                count += len(records)
+        return count
+
+    @classmethod
+    def load_binary_file(cls, filename: str, mmap: bool = True) -> np.ndarray:
+        """
+        Load the records of a binary file written by to_binary_file.
+
+        Args:
+            filename (str): The name of the file.
+            mmap (bool): If True, map the file instead of reading it.
+        Raises:
+            ValueError: If the file is not a SimpleQubit binary file.
+        Returns:
+            np.ndarray: structured array of BINARY_DTYPE records
+        """
+        with open(filename, "rb") as binary_file:
+            if binary_file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{filename} is not a SimpleQubit binary file")
+        if os.path.getsize(filename) == len(BINARY_MAGIC):
+            return np.empty(0, dtype=binary_dtype())
+        if mmap:
+            return np.memmap(filename, dtype=binary_dtype(), mode="r", offset=len(BINARY_MAGIC))
+        return np.fromfile(filename, dtype=binary_dtype(), offset=len(BINARY_MAGIC))
+
     def to_json(self, filename=None) -> str:
         """
         Serialize instance of SimpleQubit into a json in string or file format.
@@ -189,12 +716,32 @@ class SimpleQubit:
                 "connection_layer": self.connection_layer,
             },
         }
-        json_string = json.dumps(data)
+        with _profile(self, "serialization"):
+            json_string = json.dumps(data)
         if filename is not None:
-            with open(filename, "w") as json_file:
-                json_file.write(json_string)
+            with _profile(self, "file_write"):
+                with open(filename, "w") as json_file:
+                    json_file.write(json_string)
         return json_string
 
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Initialize the class from json data which has already been parsed.
+
+        Args:
+            data (dict): The json data of the instance.
+        Raises:
+            ValidationError: If the data is not compliant with the schema.
+        Returns:
+            SimpleQubit: new instance of SimpleQubit
+        """
+        cls.validate(data)
+        # Only the layout parameters are read: the schema allows other properties,
+        # which must not set the keyword-only tessellation settings.
+        merged = {**data["junction"], **data["wire"], **data["connection"], **data["layers"]}
+        return cls(**{name: merged[name] for name in cls.PARAMETERS})
+
     @classmethod
     def from_json(cls, json_string: str):
         """
@@ -205,15 +752,35 @@ class SimpleQubit:
         Returns:
             SimpleQubit: new instance of SimpleQubit
         """
-        data = json.loads(json_string)
+        with _profile(cls, "serialization"):
+            data = json.loads(json_string)
         try:
-            validate(instance=data, schema=cls.get_json_schema())
-            return cls(**data["junction"], **data["wire"], **data["connection"], **data["layers"])
-        except ValidationError as e:
+            return cls.from_dict(data)
+        except jsonschema.ValidationError as e:
             print("Validation testing failed. Json file is not compliant with schema.")
             return None
         
 
+    @classmethod
+    def from_arrays(cls, records=None, **arrays):
+        """
+        Initialize a batch of layouts from arrays of parameters, for parameter sweeps.
+        Arrays are broadcast against each other, so scalars can be used for the
+        parameters that are not swept.
+
+        Args:
+            records (np.ndarray): Optional structured array with one field per parameter.
+            **arrays: Arrays of parameters by name. They override fields of records.
+        Returns:
+            SimpleQubitBatch: batch which computes the polygons of all points at once
+        """
+        from SimpleQubitBatch import SimpleQubitBatch
+
+        if records is not None:
+            fields = records.dtype.names or ()
+            arrays = {**{name: records[name] for name in fields}, **arrays}
+        return SimpleQubitBatch(**arrays)
+
     @classmethod
     def from_json_file(cls, filename: str):
         """
@@ -225,13 +792,324 @@ class SimpleQubit:
             SimpleQubit: new instance of SimpleQubit
         """
         try:
-            with open(filename, "r") as json_file:
-                json_string = json_file.read()
-                return cls.from_json(json_string)
+            with _profile(cls, "file_read"):
+                with open(filename, "r") as json_file:
+                    json_string = json_file.read()
+            return cls.from_json(json_string)
         except Exception as e:
             print(f"Could not read the json file {json_file}. \nException: {e}")
             return None
 
+    @classmethod
+    def from_gds(cls, filename: str, cell_name: str = "CIRCUIT"):
+        """
+        Initialize the class from a gds file written by to_gds, recovering the
+        parameters from the geometry. Only the qubit cell and the cells it
+        references are decoded.
+
+        Args:
+            filename (str): The name of the gds file.
+            cell_name (str): The name of the cell which contains the qubit layout.
+        Returns:
+            SimpleQubit: new instance of SimpleQubit
+        """
+        from GdsStream import GdsReader
+
+        try:
+            with GdsReader(filename) as reader:
+                circuit = reader.read_cells([cell_name])[cell_name]
+                references = circuit["references"]
+                wire_names = {reference["name"] for reference in references}
+                if len(wire_names) != 1:
+                    raise ValueError(f"Cell {cell_name} should reference exactly one cell.")
+                wire_connection = reader.read_cells(wire_names)[wire_names.pop()]
+
+            (junction_layer, _, junction), = circuit["polygons"]
+            junction_min = junction.min(axis=0)
+            junction_width, junction_height = junction.max(axis=0) - junction_min
+            # The first reference is not rotated and sits at (offset, junction height).
+            reference = min(references, key=lambda reference: reference["rotation"] % 360)
+            junction_offset = reference["origin"][0] - junction_min[0]
+            if reference["rotation"] % 360:
+                junction_offset = junction_width - junction_offset
+
+            # The wire is the rectangle with a corner at the origin, the others are the pad.
+            wire, pad = [], []
+            for polygon in wire_connection["polygons"]:
+                is_wire = len(polygon[2]) == 4 and np.allclose(polygon[2].min(axis=0), 0)
+                (wire if is_wire else pad).append(polygon)
+            (wire_layer, _, wire), = wire
+            wire_width, wire_height = wire.max(axis=0)
+            pad_points = np.concatenate([points for _, _, points in pad])
+            # The pad has a vertex at angle 0, which is not moved by the grid
+            # rounding, unlike the diagonal vertices.
+            connection_radius = np.abs(pad_points - (0, wire_height)).max()
+            return cls(
+                connection_radius=float(connection_radius),
+                junction_width=float(junction_width),
+                junction_height=float(junction_height),
+                junction_offset=float(junction_offset),
+                wire_width=float(wire_width),
+                wire_height=float(wire_height),
+                wire_layer=wire_layer,
+                junction_layer=junction_layer,
+                connection_layer=pad[0][0],
+            )
+        except Exception as e:
+            print(f"Could not read the gds file {filename}. \nException: {e}")
+            return None
+
+    @classmethod
+    def iter_from_ndjson(cls, source, chunk_size: int = 1 << 20):
+        """
+        Deserialize newline-delimited json, one instance per line, reading the
+        source in chunks so that large files are never fully loaded in memory.
+        Blank lines are skipped.
+
+        Args:
+            source: Name of the file, or binary stream to read from. Files
+                ending in .gz or .zst are decompressed while reading.
+            chunk_size (int): Number of bytes read at a time.
+        Returns:
+            Iterator of SimpleQubit, or of RecordError for lines which could not
+            be deserialized
+        """
+        with open_stream(source, "rb") as stream:
+            line_number = 0
+            remainder = b""
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    line_number += 1
+                    if line.strip():
+                        yield cls._from_ndjson_line(line, line_number)
+            if remainder.strip():
+                yield cls._from_ndjson_line(remainder, line_number + 1)
+
+    @classmethod
+    def to_ndjson(
+        cls, qubits, filename, compression: str = None, buffer_size: int = 1 << 20
+    ) -> int:
+        """
+        Serialize many instances of SimpleQubit into newline-delimited json, one
+        instance per line, in a single pass over one file.
+
+        Args:
+            qubits: Iterable of SimpleQubit instances.
+            filename: Name of the file, or binary stream to write to.
+            compression (str): "gzip", "zstd" or "none". If None, it is inferred
+                from the file extension (.gz or .zst).
+            buffer_size (int): Number of bytes collected before each write.
+        Returns:
+            int: number of instances written
+        """
+        count = 0
+        with open_stream(filename, "wb", compression) as stream:
+            lines = []
+            size = 0
+            for qubit in qubits:
+                line = qubit.to_json().encode() + b"\n"
+                lines.append(line)
+                size += len(line)
+                count += 1
+                if size >= buffer_size:
+                    stream.write(b"".join(lines))
+                    lines = []
+                    size = 0
+            stream.write(b"".join(lines))
+        return count
+
+    @classmethod
+    def _from_ndjson_line(cls, line: bytes, line_number: int):
+        try:
+            return cls.from_dict(json.loads(line))
+        except jsonschema.ValidationError as e:
+            return RecordError(line_number, f"Json is not compliant with schema: {e.message}", line)
+        except (ValueError, TypeError) as e:
+            return RecordError(line_number, str(e), line)
+
+
+def open_compressed(filename, mode: str = "rb", compression: str = None):
+    """
+    Open a binary file, compressing or decompressing it on the fly.
+
+    Args:
+        filename (str): The name of the file.
+        mode (str): "rb" or "wb".
+        compression (str): "gzip", "zstd" or "none". If None, it is inferred
+            from the file extension (.gz or .zst).
+    Returns:
+        File object
+    """
+    if compression is None:
+        compression = COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1], "none")
+    if compression == "none":
+        return open(filename, mode)
+    if compression == "gzip":
+        return gzip.open(filename, mode)
+    if compression == "zstd":
+        try:
+            from compression import zstd
+        except ImportError:
+            try:
+                import zstandard as zstd
+            except ImportError:
+                raise ImportError("zstd compression requires the zstandard package") from None
+        return zstd.open(filename, mode)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def open_stream(file, mode: str = "rb", compression: str = None):
+    """
+    Open a file name with open_compressed, or use a binary stream as is. The
+    stream is not closed when the returned context manager exits, so that
+    the caller which opened it can keep using it.
+
+    Args:
+        file: The name of the file, or a binary stream.
+        mode (str): "rb" or "wb".
+        compression (str): "gzip", "zstd" or "none". If None, it is inferred
+            from the file extension (.gz or .zst). Only used for file names.
+    Returns:
+        Context manager which gives the file object
+    """
+    if isinstance(file, (str, os.PathLike)):
+        return open_compressed(file, mode, compression)
+    return contextlib.nullcontext(file)
+
+
+def _profile(owner, stage: str):
+    # Context manager measuring a stage with the profiler of an instance or class, if any.
+    profiler = owner.profiler
+    return _NOT_PROFILED if profiler is None else profiler.stage(stage)
+
+
+_NOT_PROFILED = contextlib.nullcontext()
+
+
+# Compression inferred from the extension of file names.
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+@functools.lru_cache(maxsize=None)
+def binary_dtype() -> np.dtype:
+    """
+    Get the fixed little-endian layout of the parameters used by the binary
+    format, also available as BINARY_DTYPE. It is created on first use so
+    that numpy is not imported with the module.
+
+    Returns:
+        np.dtype: structured dtype with one field per parameter
+    """
+    return np.dtype(
+        [
+            (name, "<i4" if name in SimpleQubit.LAYER_PARAMETERS else "<f8")
+            for name in SimpleQubit.PARAMETERS
+        ]
+    )
+
+
+def __getattr__(name: str):
+    if name == "BINARY_DTYPE":
+        return binary_dtype()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Header of binary files, followed by the records.
+BINARY_MAGIC = b"SQUBIT01"
+
+
+@dataclass
+class ComponentGeometry:
+    """
+    Describe the exact geometry of one component of the circuit.
+    """
+
+    layer: int
+    area: float
+    perimeter: float
+    bounding_box: tuple
+
+
+def _rectangle_geometry(layer: int, x_min: float, y_min: float, x_max: float, y_max: float):
+    width, height = x_max - x_min, y_max - y_min
+    return ComponentGeometry(layer, width * height, 2 * (width + height), ((x_min, y_min), (x_max, y_max)))
+
+
+def _circle_geometry(layer: int, x: float, y: float, radius: float):
+    return ComponentGeometry(
+        layer,
+        math.pi * radius**2,
+        2 * math.pi * radius,
+        ((x - radius, y - radius), (x + radius, y + radius)),
+    )
+
+
+@dataclass
+class RecordError:
+    """
+    Describe a record of a bulk file which could not be deserialized.
+    """
+
+    line_number: int
+    message: str
+    line: bytes
+
+
+def _compile_fast_validator(schema: dict):
+    """
+    Generate a validator function for the subset of json schema made of the
+    "type", "properties" and "required" keywords.
+
+    Args:
+        schema (dict): The json schema.
+    Returns:
+        callable: function which returns whether the data is valid, or None if
+            the schema uses other keywords
+    """
+    if set(schema) - {"type", "properties", "required"}:
+        return None
+    type_check = _FAST_TYPE_CHECKS.get(schema.get("type", "any"))
+    if type_check is None:
+        return None
+    properties = {}
+    for name, subschema in schema.get("properties", {}).items():
+        properties[name] = _compile_fast_validator(subschema)
+        if properties[name] is None:
+            return None
+    required = tuple(schema.get("required", ()))
+
+    def fast_validator(data) -> bool:
+        if not type_check(data):
+            return False
+        if required or properties:
+            if not isinstance(data, dict):
+                return True
+            for name in required:
+                if name not in data:
+                    return False
+            for name, validator in properties.items():
+                if name in data and not validator(data[name]):
+                    return False
+        return True
+
+    return fast_validator
+
+
+# Type checks matching jsonschema for values produced by json.loads.
+_FAST_TYPE_CHECKS = {
+    "any": lambda value: True,
+    "object": lambda value: type(value) is dict,
+    "number": lambda value: type(value) in (int, float),
+    "integer": lambda value: type(value) is int or (type(value) is float and value.is_integer()),
+    "string": lambda value: type(value) is str,
+    "boolean": lambda value: type(value) is bool,
+}
+
 
 if __name__ == "__main__":
     # Define a basic test case to initialize class instance.
@@ -0,0 +1,228 @@
+import numpy as np
+from SimpleQubit import DEFAULT_TOLERANCE, SimpleQubit
+
+
+class SimpleQubitBatch:
+    """
+    This class holds the parameters of many SimpleQubit layouts as arrays, so
+    that the polygons of a whole parameter sweep are computed in one
+    vectorized pass. Only the points that are kept need to be drawn in gdspy.
+    """
+
+    def __init__(self, **parameters):
+        missing = [name for name in SimpleQubit.PARAMETERS if name not in parameters]
+        if missing:
+            raise ValueError(f"Missing parameters: {', '.join(missing)}")
+        arrays = np.broadcast_arrays(
+            *(np.asarray(parameters[name]) for name in SimpleQubit.PARAMETERS)
+        )
+        self.parameters = {}
+        for name, array in zip(SimpleQubit.PARAMETERS, arrays):
+            dtype = np.int32 if name in SimpleQubit.LAYER_PARAMETERS else np.float64
+            self.parameters[name] = np.ascontiguousarray(array.ravel(), dtype=dtype)
+
+    @classmethod
+    def from_records(cls, records: np.ndarray):
+        """
+        Initialize the batch from a structured array with one field per parameter.
+
+        Args:
+            records (np.ndarray): Structured array with the fields of SimpleQubit.PARAMETERS.
+        Returns:
+            SimpleQubitBatch: new batch with one qubit per record
+        """
+        fields = records.dtype.names or ()
+        return cls(**{name: records[name] for name in SimpleQubit.PARAMETERS if name in fields})
+
+    def __len__(self) -> int:
+        return len(self.parameters["junction_width"])
+
+    def __getattr__(self, name):
+        parameters = self.__dict__.get("parameters", {})
+        if name in parameters:
+            return parameters[name]
+        raise AttributeError(name)
+
+    def number_of_points(self, tolerance: float = DEFAULT_TOLERANCE) -> int:
+        """
+        Get the number of vertices used for every connection pad in the batch.
+        This follows gdspy.Round for the largest radius, so smaller pads are
+        drawn at least as finely as gdspy would. An empty batch, or pads no
+        larger than the tolerance, use the minimum of 3 vertices.
+
+        Args:
+            tolerance (float): Approximation tolerance of the pads.
+        Returns:
+            int: number of vertices per pad
+        """
+        if len(self) == 0:
+            return 3
+        radius = float(self.connection_radius.max())
+        if tolerance >= radius:
+            return 3
+        return max(3, 1 + int(np.pi / np.arccos(1 - tolerance / radius) + 0.5))
+
+    def polygons(self, number_of_points: int = None) -> dict:
+        """
+        Compute the vertices of all polygons in the batch. The second wire and
+        connection are rotated by 180 degrees, as in SimpleQubit.draw().
+
+        Args:
+            number_of_points (int): Vertices per connection pad. If None, it is
+                chosen with SimpleQubit's default tolerance.
+        Returns:
+            dict: arrays of vertices with shapes
+                "junction": (N, 4, 2), "wire": (N, 2, 4, 2) and
+                "connection": (N, 2, number_of_points, 2)
+        """
+        if number_of_points is None:
+            number_of_points = self.number_of_points()
+        p = self.parameters
+        zero = np.zeros(len(self))
+        junction = _rectangles(zero, zero, p["junction_width"], p["junction_height"])
+        wire = _rectangles(zero, zero, p["wire_width"], p["wire_height"])
+
+        t = np.arange(number_of_points) * 2.0 * np.pi / number_of_points
+        connection = np.empty((len(self), number_of_points, 2))
+        connection[..., 0] = np.cos(t) * p["connection_radius"][:, None]
+        connection[..., 1] = np.sin(t) * p["connection_radius"][:, None] + p["wire_height"][:, None]
+
+        # Placement of the two WIRE_CONNECTION references.
+        first = np.stack([p["junction_offset"], p["junction_height"]], axis=-1)[:, None, :]
+        second = np.stack([p["junction_width"] - p["junction_offset"], zero], axis=-1)[:, None, :]
+        return {
+            "junction": junction,
+            "wire": np.stack([first + wire, second - wire], axis=1),
+            "connection": np.stack([first + connection, second - connection], axis=1),
+        }
+
+    def polygon_arrays(self, number_of_points: int = None) -> dict:
+        """
+        Get the polygons of all points as one contiguous vertex buffer per
+        layer, in the ragged array layout of SimpleQubit.get_polygon_arrays.
+        Polygons are ordered by component, then by point. When a component
+        uses the same layer for all points and no other component shares it,
+        the vertices are a view of the arrays of polygons(), without copy.
+
+        Args:
+            number_of_points (int): Vertices per connection pad, as in polygons().
+        Returns:
+            dict: for each layer, a tuple (vertices, offsets) of arrays with
+                shapes (V, 2) and (P + 1,)
+        """
+        polygons = self.polygons(number_of_points)
+        parts = {}
+        for component, layer_name in (
+            ("junction", "junction_layer"),
+            ("wire", "wire_layer"),
+            ("connection", "connection_layer"),
+        ):
+            # One row of polygons of the same size per point.
+            shape = polygons[component].shape
+            vertices = polygons[component].reshape(len(self), int(np.prod(shape[1:-1])), 2)
+            size = shape[-2]
+            layers = self.parameters[layer_name]
+            for layer in np.unique(layers):
+                selected = vertices if len(layers) and (layers == layer).all() else vertices[layers == layer]
+                parts.setdefault(int(layer), []).append((selected.reshape(-1, 2), size))
+        arrays = {}
+        for layer, layer_parts in parts.items():
+            if len(layer_parts) == 1:
+                vertices = layer_parts[0][0]
+            else:
+                vertices = np.concatenate([part for part, _ in layer_parts])
+            sizes = np.concatenate([np.full(len(part) // size, size) for part, size in layer_parts])
+            offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=offsets[1:])
+            arrays[layer] = (vertices, offsets)
+        return arrays
+
+    def components(self) -> dict:
+        """
+        Compute the exact geometry of each component of all points, like
+        SimpleQubit.get_components, without tessellating the connection pads.
+
+        Returns:
+            dict: for "junction", "wire_1", "wire_2", "connection_1" and
+                "connection_2", a dict of arrays "area" (N,), "perimeter" (N,)
+                and "bounding_box" (N, 2, 2)
+        """
+        p = self.parameters
+        zero = np.zeros(len(self))
+        jw, jh, offset = p["junction_width"], p["junction_height"], p["junction_offset"]
+        ww, wh, r = p["wire_width"], p["wire_height"], p["connection_radius"]
+        x1, y1 = offset, jh
+        x2, y2 = jw - offset, zero
+        return {
+            "junction": _rectangle_components(zero, zero, jw, jh),
+            "wire_1": _rectangle_components(x1, y1, x1 + ww, y1 + wh),
+            "wire_2": _rectangle_components(x2 - ww, y2 - wh, x2, y2),
+            "connection_1": _circle_components(x1, y1 + wh, r),
+            "connection_2": _circle_components(x2, y2 - wh, r),
+        }
+
+    def bounding_boxes(self) -> np.ndarray:
+        """
+        Compute the exact bounding box of every point.
+
+        Returns:
+            np.ndarray: array of shape (N, 2, 2) with ((x_min, y_min), (x_max, y_max)) per point
+        """
+        boxes = np.stack([c["bounding_box"] for c in self.components().values()], axis=1)
+        return np.stack([boxes[:, :, 0].min(axis=1), boxes[:, :, 1].max(axis=1)], axis=1)
+
+    def to_qubits(self, indices=None) -> list:
+        """
+        Create SimpleQubit instances for some points of the batch.
+
+        Args:
+            indices: Integer indices or boolean mask of the points. If None, all points.
+        Returns:
+            list[SimpleQubit]
+        """
+        selected = np.arange(len(self)) if indices is None else np.arange(len(self))[indices]
+        return [
+            SimpleQubit(**{name: self.parameters[name][i].item() for name in SimpleQubit.PARAMETERS})
+            for i in np.atleast_1d(selected)
+        ]
+
+    def draw(self, indices=None) -> list:
+        """
+        Draw some points of the batch in gdspy.
+
+        Args:
+            indices: Integer indices or boolean mask of the points. If None, all points.
+        Returns:
+            list[gdspy.Cell]
+        """
+        return [qubit.draw() for qubit in self.to_qubits(indices)]
+
+
+def _rectangle_components(x0, y0, x1, y1) -> dict:
+    width, height = x1 - x0, y1 - y0
+    return {
+        "area": width * height,
+        "perimeter": 2 * (width + height),
+        "bounding_box": np.stack([np.stack([x0, y0], axis=-1), np.stack([x1, y1], axis=-1)], axis=1),
+    }
+
+
+def _circle_components(x, y, radius) -> dict:
+    return {
+        "area": np.pi * radius**2,
+        "perimeter": 2 * np.pi * radius,
+        "bounding_box": _rectangle_components(x - radius, y - radius, x + radius, y + radius)["bounding_box"],
+    }
+
+
+def _rectangles(x0, y0, x1, y1) -> np.ndarray:
+    # Same vertex order as gdspy.Rectangle.
+    return np.stack(
+        [
+            np.stack([x0, y0], axis=-1),
+            np.stack([x0, y1], axis=-1),
+            np.stack([x1, y1], axis=-1),
+            np.stack([x1, y0], axis=-1),
+        ],
+        axis=1,
+    )
@@ -0,0 +1,219 @@
+import heapq
+import math
+import numpy as np
+from Connectivity import bounding_boxes, contains, squared_segment_distance, touching_pairs
+
+# Number of children of each node of the trees.
+DEFAULT_NODE_SIZE = 16
+
+
+class SpatialIndex:
+    """
+    This class indexes the polygons of a layout with one R-tree per layer,
+    packed with the Sort-Tile-Recursive method: the tree is built once from
+    all polygons, with full nodes, and stored as one array of boxes per
+    level. Queries descend the levels with vectorized box tests, so they
+    only visit the branches near the queried region.
+    """
+
+    def __init__(self, polygon_arrays: dict, node_size: int = DEFAULT_NODE_SIZE):
+        self.node_size = node_size
+        self.polygon_arrays = polygon_arrays
+        self._trees = {
+            layer: _PackedTree(bounding_boxes(vertices, offsets), node_size)
+            for layer, (vertices, offsets) in polygon_arrays.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(offsets) - 1 for _, offsets in self.polygon_arrays.values())
+
+    @property
+    def layers(self) -> list:
+        return list(self.polygon_arrays)
+
+    def polygon(self, layer: int, index: int) -> np.ndarray:
+        """
+        Get the vertices of an indexed polygon.
+
+        Args:
+            layer (int): The layer of the polygon.
+            index (int): The index of the polygon in the layer.
+        Returns:
+            np.ndarray: vertices of shape (N, 2)
+        """
+        vertices, offsets = self.polygon_arrays[layer]
+        return vertices[offsets[index] : offsets[index + 1]]
+
+    def query(self, box, layers=None) -> dict:
+        """
+        Find the polygons whose bounding box intersects a box.
+
+        Args:
+            box: ((x_min, y_min), (x_max, y_max)) of the queried region.
+            layers: Layers to search. If None, all layers.
+        Returns:
+            dict: for each searched layer, the sorted indices of the polygons found
+        """
+        (x_min, y_min), (x_max, y_max) = box
+        return {
+            layer: self._trees[layer].search(x_min, y_min, x_max, y_max)
+            for layer in (self.layers if layers is None else layers)
+        }
+
+    def within_distance(self, polygon, distance: float, layers=None) -> dict:
+        """
+        Find the polygons closer to a polygon than a distance, including the
+        polygons which touch or overlap it.
+
+        Args:
+            polygon: Vertices of the polygon, of shape (N, 2).
+            distance (float): Largest distance between the polygons found and the polygon.
+            layers: Layers to search. If None, all layers.
+        Returns:
+            dict: for each searched layer, the sorted indices of the polygons found
+        """
+        polygon = np.asarray(polygon, dtype=np.float64)
+        (x_min, y_min), (x_max, y_max) = polygon.min(axis=0), polygon.max(axis=0)
+        result = {}
+        for layer in self.layers if layers is None else layers:
+            candidates = self._trees[layer].search(
+                x_min - distance, y_min - distance, x_max + distance, y_max + distance
+            )
+            if len(candidates):
+                # The polygon is tested against the candidates as polygon 0 of a small array.
+                vertices, offsets = _gather(*self.polygon_arrays[layer], candidates)
+                vertices = np.concatenate([polygon, vertices])
+                offsets = np.concatenate([[0], offsets + len(polygon)])
+                first = np.zeros(len(candidates), dtype=np.int64)
+                second = np.arange(1, len(candidates) + 1)
+                candidates = candidates[touching_pairs(vertices, offsets, first, second, distance)]
+            result[layer] = candidates
+        return result
+
+    def overlapping(self, polygon, layers=None) -> dict:
+        """
+        Find the polygons which overlap or touch a polygon.
+
+        Args:
+            polygon: Vertices of the polygon, of shape (N, 2).
+            layers: Layers to search. If None, all layers.
+        Returns:
+            dict: for each searched layer, the sorted indices of the polygons found
+        """
+        return self.within_distance(polygon, 0.0, layers)
+
+    def nearest(self, point, k: int = 1, layers=None) -> list:
+        """
+        Find the polygons nearest to a point, searching the trees best-first:
+        nodes are visited by increasing distance of their box to the point,
+        until the k nearest polygons are known.
+
+        Args:
+            point: Coordinates (x, y) of the point.
+            k (int): Number of polygons to find.
+            layers: Layers to search. If None, all layers.
+        Returns:
+            list: tuples (distance, layer, index), by increasing distance,
+                the distance being 0 for polygons which contain the point
+        """
+        x, y = float(point[0]), float(point[1])
+        # Entries are (distance, kind, layer, level, node), kind 0 for an
+        # exact polygon distance so that it comes before a box at the same distance.
+        heap = []
+        for layer in self.layers if layers is None else layers:
+            tree = self._trees[layer]
+            if tree.levels:
+                top = len(tree.levels) - 1
+                for node, distance in enumerate(_box_distances(tree.levels[top], x, y)):
+                    heapq.heappush(heap, (distance, 1, layer, top, node))
+        found = []
+        while heap and len(found) < k:
+            distance, kind, layer, level, node = heapq.heappop(heap)
+            tree = self._trees[layer]
+            if kind == 0:
+                found.append((distance, layer, node))
+            elif level == 0:
+                index = int(tree.order[node])
+                heapq.heappush(heap, (self._point_distance(layer, index, x, y), 0, layer, 0, index))
+            else:
+                children = tree.children(level, np.array([node]))
+                distances = _box_distances(tree.levels[level - 1][children], x, y)
+                for child, child_distance in zip(children.tolist(), distances):
+                    heapq.heappush(heap, (child_distance, 1, layer, level - 1, child))
+        return found
+
+    def _point_distance(self, layer: int, index: int, x: float, y: float) -> float:
+        polygon = self.polygon(layer, index)
+        point = np.array([[x, y]])
+        if contains(polygon[None], point)[0]:
+            return 0.0
+        points = np.repeat(point, len(polygon), axis=0)
+        return math.sqrt(squared_segment_distance(points, polygon, np.roll(polygon, -1, axis=0)).min())
+
+
+class _PackedTree:
+    # Levels of boxes from the leaves, which are the polygon boxes in packed
+    # order, to the root. The children of node i are the nodes i * node_size
+    # to (i + 1) * node_size - 1 of the level below.
+
+    def __init__(self, boxes: np.ndarray, node_size: int):
+        self.node_size = node_size
+        self.order = _str_order(boxes, node_size)
+        self.levels = []
+        level = boxes[self.order]
+        while len(level):
+            self.levels.append(level)
+            if len(level) == 1:
+                break
+            starts = np.arange(0, len(level), node_size)
+            level = np.stack(
+                [np.minimum.reduceat(level[:, 0], starts), np.maximum.reduceat(level[:, 1], starts)], axis=1
+            )
+
+    def children(self, level: int, nodes: np.ndarray) -> np.ndarray:
+        children = (nodes[:, None] * self.node_size + np.arange(self.node_size)).reshape(-1)
+        return children[children < len(self.levels[level - 1])]
+
+    def search(self, x_min: float, y_min: float, x_max: float, y_max: float) -> np.ndarray:
+        if not self.levels:
+            return np.empty(0, dtype=np.int64)
+        level = len(self.levels) - 1
+        nodes = np.arange(len(self.levels[level]))
+        while True:
+            boxes = self.levels[level][nodes]
+            nodes = nodes[
+                (boxes[:, 0, 0] <= x_max)
+                & (boxes[:, 1, 0] >= x_min)
+                & (boxes[:, 0, 1] <= y_max)
+                & (boxes[:, 1, 1] >= y_min)
+            ]
+            if level == 0:
+                return np.sort(self.order[nodes])
+            nodes = self.children(level, nodes)
+            level -= 1
+
+
+def _str_order(boxes: np.ndarray, node_size: int) -> np.ndarray:
+    # Sort-Tile-Recursive packing: sort the boxes by the x of their center into
+    # vertical slices of about sqrt(P) leaves, then each slice by y.
+    count = len(boxes)
+    slices = max(1, math.ceil(math.sqrt(math.ceil(count / node_size))))
+    slice_size = slices * node_size
+    centers = boxes.mean(axis=1)
+    by_x = np.argsort(centers[:, 0], kind="stable")
+    slice_of = np.arange(count) // slice_size
+    return by_x[np.lexsort((centers[by_x, 1], slice_of))]
+
+
+def _box_distances(boxes: np.ndarray, x: float, y: float) -> list:
+    dx = np.maximum(np.maximum(boxes[:, 0, 0] - x, x - boxes[:, 1, 0]), 0)
+    dy = np.maximum(np.maximum(boxes[:, 0, 1] - y, y - boxes[:, 1, 1]), 0)
+    return np.hypot(dx, dy).tolist()
+
+
+def _gather(vertices: np.ndarray, offsets: np.ndarray, indices: np.ndarray) -> tuple:
+    # Ragged polygon array of some polygons of another one.
+    sizes = offsets[indices + 1] - offsets[indices]
+    starts = np.cumsum(sizes) - sizes
+    positions = np.repeat(offsets[indices] - starts, sizes) + np.arange(sizes.sum())
+    return vertices[positions], np.concatenate([starts, [sizes.sum()]])
@@ -1,8 +1,27 @@
+import gzip
+import io
+import json
 import math
 import os.path
+import subprocess
+import sys
+import tempfile
 from dataclasses import dataclass
 import gdspy
-from SimpleQubit import SimpleQubit
+import numpy as np
+from jsonschema import ValidationError
+import benchmark
+import Connectivity
+from DesignRules import DesignRuleChecker, MinSpacing
+from GdsStream import GdsStreamWriter
+from LayoutCache import LAYOUT_CACHE, LayoutCache
+from Oasis import OasisWriter
+from Profiler import Profiler
+from QubitCatalog import QubitCatalog
+from QubitChip import QubitChip
+from QubitSweep import ParameterSweep
+from SimpleQubit import BINARY_DTYPE, RecordError, SimpleQubit, _lazy_import
+from SpatialIndex import SpatialIndex
 import unittest
 
 
@@ -24,6 +43,10 @@ def _validate_file(filename: str) -> bool:
     return os.path.isfile(filename)
 
 
+def _qubit_parameters(qubit: SimpleQubit) -> dict:
+    return {name: getattr(qubit, name) for name in SimpleQubit.PARAMETERS}
+
+
 def _calculate_gdspy_rectangle_dimensions(rectangle: gdspy.polygon.Rectangle) -> Rectangle:
     corners = rectangle.polygons[0]
     dist1 = math.dist(corners[0], corners[1])
@@ -125,6 +148,537 @@ class TestSimpleQubit(unittest.TestCase):
         self.assertTrue(_validate_file(filename=output_json))
         self.assertTrue(self.qubit.from_json_file(filename=output_json))
 
+    def test_draw_is_cached(self):
+        qubit = SimpleQubit.from_json(self.qubit.to_json())
+        layout = qubit.draw()
+        self.assertIs(qubit.draw(), layout)
+        qubit.invalidate()
+        self.assertIsNot(qubit.draw(), layout)
+
+    def test_draw_after_parameter_change(self):
+        qubit = SimpleQubit.from_json(self.qubit.to_json())
+        layout = qubit.draw()
+        qubit.junction_width = 2 * self.junction.width
+        self.assertIsNot(qubit.draw(), layout)
+        junction = [s for s in qubit.get_polygonsets() if self.layers["junction_layer"] in s.layers]
+        actual = _calculate_gdspy_rectangle_dimensions(junction[0])
+        self.assertTrue(Rectangle(2 * self.junction.width, self.junction.height).equals(actual))
+
+    def test_layout_cache_shared_between_instances(self):
+        cache = LayoutCache(max_entries=1)
+        first = SimpleQubit.from_json(self.qubit.to_json())
+        second = SimpleQubit.from_json(self.qubit.to_json())
+        first.layout_cache = second.layout_cache = cache
+        self.assertIs(first.draw(), second.draw())
+        self.assertEqual(cache.stats()["hits"], 1)
+        second.junction_width = 2 * self.junction.width
+        self.assertIsNot(second.draw(), first.layout)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_layout_cache_memory_budget(self):
+        cache = LayoutCache(max_bytes=0)
+        qubit = SimpleQubit.from_json(self.qubit.to_json())
+        qubit.layout_cache = cache
+        qubit.draw()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.current_bytes, 0)
+
+    def test_from_arrays_matches_draw(self):
+        widths = np.array([self.junction.width, 3.0])
+        batch = SimpleQubit.from_arrays(
+            junction_width=widths,
+            junction_height=self.junction.height,
+            junction_offset=self.offset,
+            wire_width=self.wire.width,
+            wire_height=self.wire.height,
+            connection_radius=self.connection.radius,
+            **self.layers
+        )
+        self.assertEqual(len(batch), 2)
+        polygons = batch.polygons()
+        self.assertEqual(polygons["junction"].shape, (2, 4, 2))
+        self.assertEqual(polygons["wire"].shape, (2, 2, 4, 2))
+        expected = self.layout.get_polygons(by_spec=True)
+        layer = self.layers["connection_layer"]
+        for actual, drawn in zip(polygons["connection"][0], expected[(layer, 0)]):
+            np.testing.assert_allclose(actual, drawn, atol=1e-9)
+        layer = self.layers["wire_layer"]
+        for actual, drawn in zip(polygons["wire"][0], expected[(layer, 0)]):
+            np.testing.assert_allclose(actual, drawn, atol=1e-9)
+        qubit, = batch.to_qubits([1])
+        self.assertEqual(qubit.junction_width, 3.0)
+        self.assertEqual(len(batch.draw(widths > 2.5)), 1)
+
+    def test_batch_edge_cases(self):
+        parameters = _qubit_parameters(self.qubit)
+        empty = SimpleQubit.from_arrays(**{**parameters, "junction_width": []})
+        self.assertEqual(len(empty), 0)
+        polygons = empty.polygons()
+        self.assertEqual(polygons["junction"].shape, (0, 4, 2))
+        self.assertEqual(polygons["connection"].shape, (0, 2, empty.number_of_points(), 2))
+        self.assertEqual(empty.polygon_arrays(), {})
+
+        # Pads smaller than the tolerance, down to radius 0, use the fewest vertices.
+        tiny = SimpleQubit.from_arrays(**{**parameters, "connection_radius": [0.0, 1e-4]})
+        self.assertEqual(tiny.number_of_points(), 3)
+        self.assertTrue(np.isfinite(tiny.polygons()["connection"]).all())
+        self.assertEqual(SimpleQubit.from_arrays(**{**parameters, "connection_radius": 0.0}).number_of_points(), 3)
+
+    def test_parameter_sweep(self):
+        grid = {name: [value] for name, value in _qubit_parameters(self.qubit).items()}
+        grid["junction_width"] = [2.0, 2.5, 3.0]
+        with tempfile.TemporaryDirectory() as output_dir:
+            sweep = ParameterSweep(grid, output_dir=output_dir, max_workers=2, chunksize=2)
+            results = sweep.run()
+            self.assertEqual([result.index for result in results], [0, 1, 2])
+            for result in results:
+                self.assertTrue(_validate_file(result.files["gds"]))
+                qubit = SimpleQubit.from_json_file(result.files["json"])
+                self.assertEqual(qubit.junction_width, result.parameters["junction_width"])
+            # Points of NumPy arrays, or 0-d arrays, are exported like Python scalars.
+            grid["junction_width"] = np.array([2.0, 2.5], dtype=np.float32)
+            grid["wire_layer"] = np.array([1, 3])
+            grid["junction_height"] = np.float64(self.junction.height)
+            results = ParameterSweep(grid, output_dir=output_dir, max_workers=1).run()
+            self.assertEqual([result.parameters["wire_layer"] for result in results], [1, 3, 1, 3])
+            for result in results:
+                self.assertIs(type(result.parameters["wire_layer"]), int)
+                qubit = SimpleQubit.from_json_file(result.files["json"])
+                self.assertEqual(qubit.wire_layer, result.parameters["wire_layer"])
+            grid["junction_width"] = []
+            self.assertEqual(ParameterSweep(grid, output_dir=output_dir).run(), [])
+
+    def test_validator_is_compiled_once(self):
+        self.assertIs(SimpleQubit.get_validator(), SimpleQubit.get_validator())
+        fast_validator = SimpleQubit.get_fast_validator()
+        data = json.loads(self.qubit.to_json())
+        self.assertTrue(fast_validator(data))
+        data["wire"]["wire_width"] = True
+        self.assertFalse(fast_validator(data))
+        self.assertIsNone(SimpleQubit.from_json(json.dumps(data)))
+        del data["wire"]
+        self.assertFalse(fast_validator(data))
+        self.assertRaises(ValidationError, SimpleQubit.validate, data)
+
+        # Properties beyond the parameters are allowed, but do not set the tessellation.
+        data = json.loads(self.qubit.to_json())
+        data["wire"]["number_of_points"] = "lots"
+        qubit = SimpleQubit.from_json(json.dumps(data))
+        self.assertIsNone(qubit.number_of_points)
+        self.assertEqual(qubit.cache_key(), self.qubit.cache_key())
+
+    def test_iter_from_ndjson(self):
+        lines = [self.qubit.to_json(), "", "{not json", '{"junction": {}}', self.qubit.to_json()]
+        stream = io.BytesIO("\n".join(lines).encode())
+        records = list(SimpleQubit.iter_from_ndjson(stream, chunk_size=16))
+        self.assertEqual(len(records), 4)
+        self.assertIsInstance(records[0], SimpleQubit)
+        self.assertIsInstance(records[3], SimpleQubit)
+        self.assertEqual(records[3].cache_key(), self.qubit.cache_key())
+        self.assertIsInstance(records[1], RecordError)
+        self.assertEqual(records[1].line_number, 3)
+        self.assertIsInstance(records[2], RecordError)
+        self.assertEqual(records[2].line_number, 4)
+
+    def test_to_ndjson_round_trip(self):
+        qubits = [SimpleQubit.from_json(self.qubit.to_json()) for _ in range(3)]
+        qubits[1].junction_width = 3.0
+        with tempfile.TemporaryDirectory() as output_dir:
+            for name in ("qubits.ndjson", "qubits.ndjson.gz"):
+                filename = os.path.join(output_dir, name)
+                self.assertEqual(SimpleQubit.to_ndjson(qubits, filename, buffer_size=64), 3)
+                records = list(SimpleQubit.iter_from_ndjson(filename))
+                self.assertEqual([r.cache_key() for r in records], [q.cache_key() for q in qubits])
+
+    def test_binary_round_trip(self):
+        data = self.qubit.to_bytes()
+        self.assertEqual(len(data), BINARY_DTYPE.itemsize)
+        self.assertEqual(SimpleQubit.from_bytes(data).cache_key(), self.qubit.cache_key())
+        qubits = [SimpleQubit.from_json(self.qubit.to_json()) for _ in range(5)]
+        qubits[3].junction_width = 3.0
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, "qubits.bin")
+            self.assertEqual(SimpleQubit.to_binary_file(qubits, filename, chunk_size=2), 5)
+            records = SimpleQubit.load_binary_file(filename)
+            self.assertIsInstance(records, np.memmap)
+            self.assertEqual(SimpleQubit.from_record(records[3]).junction_width, 3.0)
+            self.assertEqual(records["wire_layer"][0], self.layers["wire_layer"])
+            del records
+
+    def test_qubit_catalog(self):
+        qubits = [SimpleQubit.from_json(self.qubit.to_json()) for _ in range(10)]
+        for i, qubit in enumerate(qubits):
+            qubit.junction_width = 1.5 + 0.1 * i
+        with tempfile.TemporaryDirectory() as output_dir:
+            catalog = QubitCatalog.create(os.path.join(output_dir, "catalog.bin"), qubits)
+            self.assertEqual(len(catalog), 10)
+            self.assertAlmostEqual(catalog[4].junction_width, 1.9)
+            self.assertEqual(len(catalog[2:8]), 6)
+            selected = catalog.filter(junction_width=(1.8, 2.2))
+            self.assertEqual(list(selected.indices), [3, 4, 5, 6, 7])
+            self.assertEqual(list(selected[1:3].indices), [4, 5])
+            self.assertEqual(len(selected.filter(junction_width=(None, 1.95))), 2)
+            self.assertEqual(len(selected.to_batch()), 5)
+            del catalog, selected
+
+    def test_chip_uses_cell_array(self):
+        chip = QubitChip(self.qubit, columns=100, rows=100)
+        layout = chip.draw()
+        self.assertEqual(set(chip.gds_library.cells), {"CHIP", "CIRCUIT", "WIRE_CONNECTION"})
+        self.assertEqual(len(layout.references), 1)
+        self.assertIsInstance(layout.references[0], gdspy.CellArray)
+        self.assertIs(chip.draw(), layout)
+        with tempfile.TemporaryDirectory() as output_dir:
+            small = os.path.join(output_dir, "small.gds")
+            large = os.path.join(output_dir, "large.gds")
+            QubitChip(self.qubit, columns=2, rows=2).to_gds(small)
+            chip.to_gds(large)
+            self.assertEqual(os.path.getsize(small), os.path.getsize(large))
+            gds_stream = io.BytesIO()
+            chip.to_gds(gds_stream)
+            self.assertEqual(gds_stream.getbuffer().nbytes, os.path.getsize(large))
+
+    def test_gds_stream_writer(self):
+        other = SimpleQubit.from_json(self.qubit.to_json())
+        other.junction_width = 3.0
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, "stream.gds")
+            with GdsStreamWriter(filename) as writer:
+                writer.write_qubit(self.qubit, "Q0")
+                writer.write_qubit(other, "Q1")
+                self.assertRaises(ValueError, writer.write_qubit, other, "Q1")
+            library = gdspy.GdsLibrary(infile=filename)
+            self.assertEqual(set(library.cells), {"Q0", "Q0_WIRE_CONNECTION", "Q1", "Q1_WIRE_CONNECTION"})
+            np.testing.assert_allclose(
+                library.cells["Q1"].get_bounding_box(), other.draw().get_bounding_box(), atol=1e-3
+            )
+            self.assertEqual(len(library.cells["Q0"].get_polygonsets()), len(self.shapes))
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            basename = os.path.join(output_dir, "output")
+            timings = self.qubit.export(basename=basename)
+            self.assertEqual(set(timings), {"gds", "svg", "json"})
+            for file_format in timings:
+                self.assertTrue(_validate_file(f"{basename}.{file_format}"))
+            self.assertTrue(SimpleQubit.from_json_file(f"{basename}.json"))
+
+    def test_oasis_export(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, "output.oas")
+            self.qubit.to_oasis(filename)
+            with open(filename, "rb") as oasis_file:
+                data = oasis_file.read()
+            self.assertTrue(data.startswith(b"%SEMI-OASIS\r\n"))
+            self.assertEqual(data[-256], 2)
+
+            small = os.path.join(output_dir, "small.oas")
+            large = os.path.join(output_dir, "large.oas")
+            QubitChip(self.qubit, columns=2, rows=2).to_oasis(small)
+            QubitChip(self.qubit, columns=100, rows=100).to_oasis(large)
+            self.assertLessEqual(os.path.getsize(large) - os.path.getsize(small), 4)
+
+    def test_oasis_repeated_polygons(self):
+        cell = gdspy.Cell("REPEATED", exclude_from_current=True)
+        for i in range(100):
+            cell.add(gdspy.Round((10 * i, 0), self.connection.radius))
+        stream = io.BytesIO()
+        with OasisWriter(stream) as writer:
+            writer.write_cell(cell)
+        single = io.BytesIO()
+        with OasisWriter(single) as writer:
+            writer.write_cell(gdspy.Cell("REPEATED", exclude_from_current=True).add(cell.polygons[0]))
+        self.assertLess(len(stream.getvalue()) - len(single.getvalue()), 10)
+
+    def test_compressed_gds_export(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, "output.gds.gz")
+            self.qubit.to_gds(filename)
+            with gzip.open(filename, "rb") as gds_file:
+                library = gdspy.GdsLibrary(infile=gds_file)
+            self.assertEqual(set(library.cells), {"CIRCUIT", "WIRE_CONNECTION"})
+            self.assertEqual(len(library.cells["CIRCUIT"].get_polygonsets()), len(self.shapes))
+
+    def test_gds_export_to_stream(self):
+        for profiler in (None, Profiler()):
+            self.qubit.profiler = profiler
+            gds_stream = io.BytesIO()
+            self.qubit.to_gds(gds_stream)
+            self.assertFalse(gds_stream.closed)
+            gds_stream.seek(0)
+            library = gdspy.GdsLibrary(infile=gds_stream)
+            self.assertEqual(len(library.cells["CIRCUIT"].get_polygonsets()), len(self.shapes))
+        self.qubit.profiler = None
+        gds_stream = io.BytesIO()
+        with GdsStreamWriter(gds_stream) as writer:
+            writer.write_qubit(self.qubit, "Q0")
+        gds_stream.seek(0)
+        self.assertIn("Q0", gdspy.GdsLibrary(infile=gds_stream).cells)
+
+    def test_from_gds(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            for name in ("output.gds", "output.gds.gz"):
+                filename = os.path.join(output_dir, name)
+                self.qubit.to_gds(filename)
+                qubit = SimpleQubit.from_gds(filename)
+                for expected, actual in zip(self.qubit.cache_key(), qubit.cache_key()):
+                    self.assertAlmostEqual(expected, actual, places=9)
+            filename = os.path.join(output_dir, "stream.gds")
+            with GdsStreamWriter(filename) as writer:
+                writer.write_qubit(self.qubit, "Q0")
+            self.assertEqual(SimpleQubit.from_gds(filename, "Q0").cache_key(), qubit.cache_key())
+            self.assertIsNone(SimpleQubit.from_gds(filename, "MISSING"))
+
+    def test_json_round_trip_does_not_import_heavy_modules(self):
+        code = (
+            "import sys, SimpleQubit\n"
+            "qubit = SimpleQubit.SimpleQubit.from_json(sys.argv[1])\n"
+            "qubit.from_json(qubit.to_json())\n"
+            "loaded = [m for m in ('gdspy', 'numpy', 'jsonschema') if type(sys.modules.get(m)).__name__ == 'module']\n"
+            "print(','.join(loaded))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code, self.qubit.to_json()],
+            capture_output=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True,
+        )
+        self.assertEqual(output.stdout.strip(), "")
+        with self.assertRaises(ModuleNotFoundError) as error:
+            _lazy_import("a_module_which_is_not_installed")
+        self.assertEqual(error.exception.name, "a_module_which_is_not_installed")
+
+    def test_analytic_geometry(self):
+        components = self.qubit.get_components()
+        self.assertEqual(set(components), {"junction", "wire_1", "wire_2", "connection_1", "connection_2"})
+        self.assertAlmostEqual(components["junction"].area, self.junction.width * self.junction.height)
+        self.assertAlmostEqual(components["wire_2"].perimeter, 2 * (self.wire.width + self.wire.height))
+        self.assertAlmostEqual(components["connection_1"].area, math.pi * self.connection.radius**2)
+        drawn = [s for s in self.shapes if self.layers["connection_layer"] in s.layers]
+        area = components["connection_1"].area
+        self.assertAlmostEqual(drawn[0].area(), area, delta=0.01 * area)
+        np.testing.assert_allclose(self.qubit.get_bounding_box(), self.layout.get_bounding_box(), atol=0.01)
+
+        batch = SimpleQubit.from_arrays(
+            **{name: [getattr(self.qubit, name)] * 2 for name in SimpleQubit.PARAMETERS}
+        )
+        np.testing.assert_allclose(batch.bounding_boxes()[1], self.qubit.get_bounding_box())
+        self.assertAlmostEqual(batch.components()["wire_1"]["area"][0], components["wire_1"].area)
+
+    def test_tessellation_settings(self):
+        qubit = SimpleQubit.from_json(self.qubit.to_json())
+        qubit.connection_radius = 100.0
+        pads = [s for s in qubit.get_polygonsets() if self.layers["connection_layer"] in s.layers]
+        self.assertEqual(len(pads[0].polygons), 2)
+
+        qubit.adaptive = True
+        pads = [s for s in qubit.get_polygonsets() if self.layers["connection_layer"] in s.layers]
+        self.assertEqual(len(pads[0].polygons), 1)
+        self.assertEqual(len(pads[0].polygons[0]), qubit.get_number_of_points())
+        self.assertEqual(qubit.get_number_of_points() % 4, 0)
+
+        qubit.tolerance = 1.0
+        self.assertLess(qubit.get_number_of_points(), 50)
+        qubit.number_of_points = 16
+        pads = [s for s in qubit.get_polygonsets() if self.layers["connection_layer"] in s.layers]
+        self.assertEqual(len(pads[0].polygons[0]), 16)
+        self.assertEqual(qubit.parameter_values()[0], 100.0)
+
+    def test_polygon_arrays(self):
+        arrays = self.qubit.get_polygon_arrays()
+        self.assertEqual(set(arrays), set(self.layers.values()))
+        self.assertIs(self.qubit.get_polygon_arrays(), arrays)
+        for (layer, _), polygons in self.layout.get_polygons(by_spec=True).items():
+            vertices, offsets = arrays[layer]
+            self.assertEqual(len(offsets), len(polygons) + 1)
+            for i, polygon in enumerate(polygons):
+                np.testing.assert_array_equal(vertices[offsets[i] : offsets[i + 1]], polygon)
+
+        batch = SimpleQubit.from_arrays(
+            **{name: [getattr(self.qubit, name)] * 3 for name in SimpleQubit.PARAMETERS}
+        )
+        batch_arrays = batch.polygon_arrays()
+        for layer, (vertices, offsets) in batch_arrays.items():
+            self.assertEqual(len(offsets) - 1, 3 * (len(arrays[layer][1]) - 1))
+            np.testing.assert_allclose(vertices[: len(arrays[layer][0])], arrays[layer][0], atol=1e-9)
+
+    def test_incremental_redraw(self):
+        qubit = SimpleQubit.from_json(self.qubit.to_json())
+        qubit.layout_cache = None
+        layout = qubit.draw()
+        wire_connection = layout.references[0].ref_cell
+        junction = layout.polygons[0]
+
+        qubit.junction_width = 3.0
+        redrawn = qubit.draw()
+        self.assertIsNot(redrawn, layout)
+        self.assertIs(redrawn.references[0].ref_cell, wire_connection)
+        self.assertIsNot(redrawn.polygons[0], junction)
+        self.assertEqual(redrawn.references[1].origin, (3.0 - self.offset, 0))
+        actual = _calculate_gdspy_rectangle_dimensions(layout.polygons[0])
+        self.assertTrue(Rectangle(self.junction.width, self.junction.height).equals(actual))
+
+        qubit.connection_radius = 5.0
+        self.assertIsNot(qubit.draw().references[0].ref_cell, wire_connection)
+        self.assertIs(qubit.draw().polygons[0], redrawn.polygons[0])
+
+    def test_benchmark_regressions(self):
+        results = benchmark.run_benchmarks(["draw", "from_json"], sizes=(2,), repeat=1)
+        self.assertEqual(set(results["benchmarks"]), {"draw[2]", "from_json[2]"})
+        self.assertEqual(benchmark.compare(results, results), [])
+
+        baseline = json.loads(json.dumps(results))
+        baseline["benchmarks"]["draw[2]"]["per_instance"] /= 2
+        del baseline["benchmarks"]["from_json[2]"]
+        regressions = benchmark.compare(results, baseline, threshold=0.5)
+        self.assertEqual([regression["benchmark"] for regression in regressions], ["draw[2]"])
+        self.assertAlmostEqual(regressions[0]["ratio"], 2.0)
+        self.assertEqual(benchmark.compare(results, baseline, threshold=1.5), [])
+
+    def test_profiler(self):
+        samples = []
+        profiler = Profiler(hooks=[samples.append])
+        qubit = SimpleQubit(**_qubit_parameters(self.qubit))
+        qubit.layout_cache = None
+        qubit.profiler = profiler
+        with tempfile.TemporaryDirectory() as directory:
+            qubit.to_gds(os.path.join(directory, "profiled.gds"))
+            qubit.to_json(os.path.join(directory, "profiled.json"))
+            gds_library = gdspy.GdsLibrary(infile=os.path.join(directory, "profiled.gds"))
+            self.assertEqual(set(gds_library.cells), {"CIRCUIT", "WIRE_CONNECTION"})
+
+            SimpleQubit.profiler = profiler
+            try:
+                SimpleQubit.from_json_file(os.path.join(directory, "profiled.json"))
+            finally:
+                SimpleQubit.profiler = None
+        self.assertEqual(
+            set(profiler.metrics),
+            {"library", "tessellation", "placement", "validation", "serialization", "file_read", "file_write"},
+        )
+        self.assertEqual(profiler.metrics["serialization"]["calls"], 3)
+        self.assertEqual(profiler.metrics["file_write"]["calls"], 2)
+        self.assertEqual(len(samples), sum(metrics["calls"] for metrics in profiler.metrics.values()))
+        for metrics in profiler.metrics.values():
+            self.assertGreater(metrics["wall_time"], 0)
+            self.assertGreaterEqual(metrics["cpu_time"], 0)
+            self.assertIsInstance(metrics["net_allocated_blocks"], int)
+
+        # Only the junction is rebuilt, so the pad is not tessellated again.
+        profiler.reset()
+        qubit.junction_width = 3.0
+        qubit.draw()
+        self.assertEqual(set(profiler.metrics), {"library", "placement"})
+
+    def test_connectivity(self):
+        self.assertTrue(self.qubit.is_connected())
+
+        # The wires no longer reach the junction.
+        qubit = SimpleQubit(**{**_qubit_parameters(self.qubit), "junction_offset": 3.0})
+        self.assertFalse(qubit.is_connected())
+        vertices, offsets, _ = Connectivity.merge_layers(qubit.get_polygon_arrays())
+        labels = Connectivity.connected_components(vertices, offsets)
+        self.assertEqual(labels.max() + 1, len(gdspy.boolean(qubit.get_polygonsets(), None, "or").polygons))
+
+        # Overlapping, touching and contained polygons, a triangle with a
+        # single touching corner, then a separate square.
+        polygons = [
+            [(0, 0), (0, 2), (2, 2), (2, 0)],
+            [(1, 1), (1, 3), (3, 3), (3, 1)],
+            [(3, 1), (3, 2), (4, 2), (4, 1)],
+            [(0.5, 0.5), (0.5, 0.7), (0.7, 0.6)],
+            [(4, 2), (5, 3), (5, 2.5)],
+            [(6, 0), (6, 1), (7, 1), (7, 0)],
+        ]
+        vertices = np.concatenate(polygons).astype(float)
+        offsets = np.cumsum([0] + [len(polygon) for polygon in polygons])
+        np.testing.assert_array_equal(Connectivity.connected_components(vertices, offsets), [0, 0, 0, 0, 0, 1])
+        vertices[offsets[-2] :, 0] -= 2.0 - 1e-4
+        np.testing.assert_array_equal(Connectivity.connected_components(vertices, offsets), [0] * 6)
+        np.testing.assert_array_equal(
+            Connectivity.connected_components(vertices, offsets, tolerance=1e-5), [0, 0, 0, 0, 0, 1]
+        )
+
+        # Rectangles whose corners are diagonally apart by gap * sqrt(2): a
+        # tolerance between gap and gap * sqrt(2) does not connect them.
+        gap = 0.01
+        vertices = np.array([(0, 0), (0, 1), (1, 1), (1, 0), (1 + gap, 1 + gap), (1 + gap, 2), (2, 2), (2, 1 + gap)])
+        offsets = np.array([0, 4, 8])
+        for tolerance, connected in ((1.2 * gap, False), (1.5 * gap, True)):
+            touching = Connectivity.touching_pairs(vertices, offsets, np.array([0]), np.array([1]), tolerance)
+            self.assertEqual(touching[0], connected)
+            self.assertEqual(Connectivity.connected_components(vertices, offsets, tolerance).max() == 0, connected)
+
+    def test_spatial_index(self):
+        chip = QubitChip(self.qubit, columns=4, rows=3)
+        polygon_arrays = chip.get_polygon_arrays()
+        expected = chip.draw().get_polygons(by_spec=True)
+        for layer, (vertices, offsets) in polygon_arrays.items():
+            self.assertEqual(len(offsets) - 1, len(expected[(layer, 0)]))
+
+        index = SpatialIndex(polygon_arrays, node_size=2)
+        self.assertEqual(len(index), 12 * 5)
+        vertices, offsets = polygon_arrays[self.layers["connection_layer"]]
+        boxes = np.stack([vertices[a:b].min(axis=0) for a, b in zip(offsets, offsets[1:])])
+        found = index.query(((-10, -10), (10, 10)), layers=[self.layers["connection_layer"]])
+        expected = np.flatnonzero((boxes[:, 0] <= 10) & (boxes[:, 1] <= 10))
+        np.testing.assert_array_equal(found[self.layers["connection_layer"]], expected)
+
+        # The first pad touches its wire, and the pads of the next qubit are further than the margin.
+        pad = index.polygon(self.layers["connection_layer"], 0)
+        found = index.within_distance(pad, chip.margin / 2)
+        np.testing.assert_array_equal(found[self.layers["connection_layer"]], [0])
+        np.testing.assert_array_equal(found[self.layers["wire_layer"]], [0])
+        self.assertEqual(len(found[self.layers["junction_layer"]]), 0)
+        overlapping = index.overlapping(pad)
+        self.assertEqual({layer: list(indices) for layer, indices in overlapping.items()}, {0: [0], 1: [0], 2: []})
+        found = index.within_distance(pad, chip.margin * 2, layers=[self.layers["connection_layer"]])
+        self.assertGreater(len(found[self.layers["connection_layer"]]), 1)
+
+        ((distance, layer, polygon),) = index.nearest(pad.mean(axis=0))
+        self.assertEqual((distance, layer, polygon), (0.0, self.layers["connection_layer"], 0))
+        nearest = index.nearest((-100.0, -100.0), k=3)
+        self.assertEqual(len(nearest), 3)
+        self.assertEqual([entry[0] for entry in nearest], sorted(entry[0] for entry in nearest))
+
+    def test_design_rules(self):
+        parameters = _qubit_parameters(self.qubit)
+        offsets = np.array([self.offset, -0.1, self.junction.width - self.wire.width / 2, self.offset, self.offset])
+        radii = np.array([self.connection.radius, self.connection.radius, self.connection.radius, 12.0, 0.0])
+        batch = SimpleQubit.from_arrays(**{**parameters, "junction_offset": offsets, "connection_radius": radii})
+        checker = DesignRuleChecker()
+        results = checker.check(batch)
+        np.testing.assert_array_equal(checker.valid(batch), [True, False, False, False, False])
+        np.testing.assert_array_equal(results["enclosure(wire_1, junction, x)"], [True, False, False, True, True])
+        np.testing.assert_array_equal(results["overlap(wire_1, junction)"], [True, True, True, True, True])
+        np.testing.assert_array_equal(results["min_spacing(connection_1, connection_2)"], [True, True, True, False, True])
+        np.testing.assert_array_equal(results["min_width(connection_1)"], [True, True, True, True, False])
+        # Points pruned by the vectorized rules are not drawn.
+        np.testing.assert_array_equal(results["connected"], [True, False, False, False, False])
+        pruned = checker.prune(batch)
+        self.assertEqual(len(pruned), 1)
+        self.assertEqual(pruned.to_qubits()[0].cache_key(), self.qubit.cache_key())
+
+        # Without pruning every point is drawn, so the pad of radius 0, which gdspy cannot draw, is left out.
+        batch = SimpleQubit.from_arrays(**{**parameters, "junction_offset": offsets[:4], "connection_radius": radii[:4]})
+        cached = len(LAYOUT_CACHE)
+        np.testing.assert_array_equal(checker.check(batch, prune=False)["connected"], [True, True, True, True])
+        # The drawn points are not kept in the shared layout cache.
+        self.assertEqual(len(LAYOUT_CACHE), cached)
+
+        # The analytic spacing of the pads agrees with the distance between the drawn polygons.
+        qubit = SimpleQubit(**{**parameters, "connection_radius": 9.0})
+        pads = qubit.get_polygon_arrays()[self.layers["connection_layer"]]
+        index = SpatialIndex({0: pads})
+        # From the center of the first pad to the boundary of the second one.
+        distance = index.nearest(index.polygon(0, 0).mean(axis=0), k=2)[1][0] - 9.0
+        for spacing, expected in ((distance - 0.05, True), (distance + 0.05, False)):
+            batch = SimpleQubit.from_arrays(**_qubit_parameters(qubit))
+            rule = MinSpacing("connection_1", "connection_2", spacing)
+            self.assertEqual(DesignRuleChecker([rule]).valid(batch)[0], expected)
+
     def call_draw_function_repeatedly(self):
         self.qubit.draw()
         self.qubit.draw()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from SimpleQubit import SimpleQubit
+from SimpleQubitBatch import SimpleQubitBatch
+
+SIZES = (1, 1000, 100000)
+
+# Relative slowdown against the baseline above which a benchmark is a regression.
+DEFAULT_THRESHOLD = 0.25
+
+# Number of distinct files read by the from_json_file benchmark.
+MAX_JSON_FILES = 1000
+
+
+def make_qubits(count: int) -> list:
+    """
+    Create qubits with distinct junction widths, so that no two of them share
+    a layout. The shared layout cache is disabled to measure the drawing itself.
+
+    Args:
+        count (int): Number of qubits.
+    Returns:
+        list[SimpleQubit]
+    """
+    batch = SimpleQubitBatch(
+        connection_radius=4.0,
+        junction_width=np.linspace(1.5, 2.5, count),
+        junction_height=0.4,
+        junction_offset=0.2,
+        wire_width=0.3,
+        wire_height=10.0,
+        wire_layer=1,
+        junction_layer=2,
+        connection_layer=0,
+    )
+    qubits = batch.to_qubits()
+    for qubit in qubits:
+        qubit.layout_cache = None
+    return qubits
+
+
+def _drawn_qubits(count: int) -> list:
+    qubits = make_qubits(count)
+    for qubit in qubits:
+        qubit.draw()
+    return qubits
+
+
+def _setup_draw(count: int, directory: str):
+    qubits = make_qubits(count)
+    return lambda: [qubit.draw() for qubit in qubits]
+
+
+def _setup_get_polygonsets(count: int, directory: str):
+    qubits = _drawn_qubits(count)
+    return lambda: [qubit.get_polygonsets() for qubit in qubits]
+
+
+def _setup_to_gds(count: int, directory: str):
+    qubits = _drawn_qubits(count)
+    filename = os.path.join(directory, "benchmark.gds")
+    return lambda: [qubit.to_gds(filename) for qubit in qubits]
+
+
+def _setup_to_svg(count: int, directory: str):
+    qubits = _drawn_qubits(count)
+    filename = os.path.join(directory, "benchmark.svg")
+    return lambda: [qubit.to_svg(filename) for qubit in qubits]
+
+
+def _setup_to_json(count: int, directory: str):
+    qubits = make_qubits(count)
+    return lambda: [qubit.to_json() for qubit in qubits]
+
+
+def _setup_from_json(count: int, directory: str):
+    strings = [qubit.to_json() for qubit in make_qubits(count)]
+    return lambda: [SimpleQubit.from_json(string) for string in strings]
+
+
+def _setup_from_json_file(count: int, directory: str):
+    filenames = []
+    for i, qubit in enumerate(make_qubits(min(count, MAX_JSON_FILES))):
+        filenames.append(os.path.join(directory, f"benchmark_{i}.json"))
+        qubit.to_json(filenames[-1])
+    return lambda: [SimpleQubit.from_json_file(filenames[i % len(filenames)]) for i in range(count)]
+
+
+# Each benchmark prepares its inputs, untimed, and returns the function to time.
+BENCHMARKS = {
+    "draw": _setup_draw,
+    "get_polygonsets": _setup_get_polygonsets,
+    "to_gds": _setup_to_gds,
+    "to_svg": _setup_to_svg,
+    "to_json": _setup_to_json,
+    "from_json": _setup_from_json,
+    "from_json_file": _setup_from_json_file,
+}
+
+
+def run_benchmarks(names=None, sizes=SIZES, repeat: int = 3) -> dict:
+    """
+    Run benchmarks and time them. Each one is prepared again before every
+    repetition and the fastest repetition is kept, which is the least
+    affected by the rest of the system.
+
+    Args:
+        names: Names of the benchmarks to run, from BENCHMARKS. If None, all of them.
+        sizes: Numbers of qubit instances to run each benchmark with.
+        repeat (int): Number of repetitions.
+    Returns:
+        dict: results with the keys "environment" and "benchmarks", the
+            latter mapping "<name>[<size>]" to a dict with the keys name,
+            count, seconds and per_instance
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names or BENCHMARKS:
+            for count in sizes:
+                times = []
+                for _ in range(repeat):
+                    run = BENCHMARKS[name](count, directory)
+                    start = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start)
+                    del run
+                seconds = min(times)
+                results[f"{name}[{count}]"] = {
+                    "name": name,
+                    "count": count,
+                    "seconds": seconds,
+                    "per_instance": seconds / count,
+                }
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compare results to a baseline. Benchmarks missing from either are ignored.
+
+    Args:
+        results (dict): Results of run_benchmarks.
+        baseline (dict): Earlier results of run_benchmarks.
+        threshold (float): Relative slowdown above which a benchmark is a regression.
+    Returns:
+        list[dict]: one dict per regression with the keys benchmark,
+            baseline, current and ratio, sorted by decreasing ratio
+    """
+    regressions = []
+    for key, result in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(key)
+        if reference is None or reference["per_instance"] <= 0:
+            continue
+        ratio = result["per_instance"] / reference["per_instance"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                {
+                    "benchmark": key,
+                    "baseline": reference["per_instance"],
+                    "current": result["per_instance"],
+                    "ratio": ratio,
+                }
+            )
+    return sorted(regressions, key=lambda regression: -regression["ratio"])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of SimpleQubit.")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run, among {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="numbers of instances")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of each benchmark")
+    parser.add_argument("--output", help="file to write the results to, as json")
+    parser.add_argument("--baseline", help="results to compare to, as json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat)
+    for key, result in results["benchmarks"].items():
+        print(f"{key:28} {result['seconds']:12.6f} s {result['per_instance'] * 1e6:12.2f} us/instance")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(
+                f"Regression in {regression['benchmark']}: {regression['current'] * 1e6:.2f} us/instance"
+                f" against {regression['baseline'] * 1e6:.2f} ({regression['ratio']:.2f}x)",
+                file=sys.stderr,
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())